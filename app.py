@@ -1,10 +1,19 @@
+import argparse
+import random
 import tcod
 import tcod.event as Event
 
 from base.game import Dispatcher, GameInstance
 from base.renderer import Renderer
 from base.map_gen import MapGenerator
-from constants import screen_width, screen_height
+from base.pathing import path_backends
+from constants import screen_width, screen_height, PATH_BACKEND, SEED
+
+parser = argparse.ArgumentParser(description="Office Rogue")
+parser.add_argument("--pathing", choices=sorted(path_backends), default=PATH_BACKEND, help="Path finding backend")
+parser.add_argument("--seed", type=int, default=SEED, help="Seed for map generation and AI")
+args = parser.parse_args()
+random.seed(args.seed)
 
 # Setup the font.
 tcod.console_set_custom_font(
@@ -19,7 +28,7 @@ with tcod.console_init_root(
     game = GameInstance()
     renderer = Renderer(game, root_console)
     dispatcher = Dispatcher(game)
-    map_gen = MapGenerator(game)
+    map_gen = MapGenerator(game, path_backend=args.pathing)
 
     map_gen.generate_map()
     map_gen.generate_path_map()
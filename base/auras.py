@@ -0,0 +1,95 @@
+from collections import deque
+
+import numpy as np
+
+from base.pathing import NEIGHBOURS
+
+
+class AuraField():
+    """
+    Intensity grids of the auras objects give off, one per aura
+     - Each emitter spreads by bounded BFS over passable tiles, so walls stop it.  Intensity falls off
+       linearly with steps taken, reaching 0 past the aura's radius
+     - Grids are the sum of their emitters' spreads.  Spreads are kept per emitter so adding or removing
+       one only touches its own cells
+     - temporary: emitters logged by object events (i.e. on_dirty), ended when the object recovers.
+       Others last as long as the object is placed
+     - Spreads depend on static passability.  If it changed since they were made, all are redone on read
+    """
+    def __init__(self, game, radius=3):
+        self.game = game
+        self.radius = radius
+        self.grids = {}
+        self.emitters = {}
+        self.version = None
+
+    def __bool__(self):
+        return bool(self.emitters)
+
+    def add(self, obj, aura, radius=None, temporary=False):
+        key = (obj, aura)
+        if key in self.emitters:
+            return None
+        self.refresh()
+        cells, values = self.spread(obj.x, obj.y, radius or self.radius)
+        self.emitters[key] = (obj.x, obj.y, radius or self.radius, temporary, cells, values)
+        self.grid(aura)[cells] += values
+
+    def remove(self, obj, temporary=None):
+        """ Ends obj's emitters.  temporary: only those with that flag, or all if None """
+        for key in [x for x in self.emitters if x[0] is obj]:
+            if temporary is not None and self.emitters[key][3] != temporary:
+                continue
+            cells, values = self.emitters.pop(key)[4:]
+            self.grids[key[1]][cells] -= values
+
+    def sources(self, aura):
+        # Where the emitters of aura are
+        return [(x[0], x[1]) for key, x in self.emitters.items() if key[1] == aura]
+
+    def grid(self, aura):
+        if aura not in self.grids:
+            grid = self.game.game_map.grid
+            self.grids[aura] = np.zeros((grid.width, grid.height), dtype=np.float32)
+        return self.grids[aura]
+
+    def spread(self, x, y, radius):
+        # Bounded BFS from (x, y) over passable tiles.  Returns (cell index arrays, intensities)
+        grid = self.game.game_map.grid
+        blocked = grid.static_blocked
+        steps = {(x, y): 0}
+        frontier = deque([(x, y)])
+        while frontier:
+            cx, cy = frontier.popleft()
+            step = steps[(cx, cy)] + 1
+            if step > radius:
+                continue
+            for dx, dy in NEIGHBOURS:
+                nx = cx + dx
+                ny = cy + dy
+                if (nx, ny) in steps or not grid.in_bounds(nx, ny) or blocked[nx, ny]:
+                    continue
+                steps[(nx, ny)] = step
+                frontier.append((nx, ny))
+
+        xs, ys = zip(*steps)
+        values = 1 - np.fromiter(steps.values(), dtype=np.float32, count=len(steps)) / (radius + 1)
+        return (np.array(xs), np.array(ys)), values
+
+    def refresh(self):
+        # Redoes every spread if walls moved since they were made
+        version = self.game.game_map.static_version
+        if version == self.version:
+            return None
+        self.version = version
+        for grid in self.grids.values():
+            grid[:] = 0
+        for (obj, aura), (x, y, radius, temporary, _, _) in self.emitters.items():
+            cells, values = self.spread(x, y, radius)
+            self.emitters[(obj, aura)] = (x, y, radius, temporary, cells, values)
+            self.grids[aura][cells] += values
+
+    def sample(self, xs, ys):
+        """ Intensity of each aura at the cells given by index arrays xs, ys.  Returns aura -> array """
+        self.refresh()
+        return {aura: grid[xs, ys] for aura, grid in self.grids.items()}
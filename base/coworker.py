@@ -1,6 +1,7 @@
-import math
-from constants import game_objects, colors
+from constants import game_objects, game_traits, colors, NEEDS_INTERVAL, RESERVATION_WINDOW
 from base.thoughts import Memories
+from base.modifiers import Modifier, StatModifiers
+from base.needs import NeedColumn
 from base.items import BaseObject, Item, attrFormatter
 
 
@@ -11,9 +12,39 @@ class Mob(BaseObject):
     """
     max_inventory = 4
 
+    # Needs, their drains per need tick and their maximums are kept in GameInstance's NeedStore,
+    # at the Mob's row, and worked out when read
+    social = NeedColumn("social")
+    hunger = NeedColumn("hunger")
+    thirst = NeedColumn("thirst")
+    bladder = NeedColumn("bladder")
+    bowels = NeedColumn("bowels")
+    energy = NeedColumn("energy")
+    work = NeedColumn("work")
+    mood = NeedColumn("mood")
+
+    social_drain = NeedColumn("social", "drain")
+    hunger_drain = NeedColumn("hunger", "drain")
+    thirst_drain = NeedColumn("thirst", "drain")
+    bladder_drain = NeedColumn("bladder", "drain")
+    bowels_drain = NeedColumn("bowels", "drain")
+    energy_drain = NeedColumn("energy", "drain")
+    work_drain = NeedColumn("work", "drain")
+    mood_drain = NeedColumn("mood", "drain")
+
+    max_social = NeedColumn("social", "maximum")
+    max_hunger = NeedColumn("hunger", "maximum")
+    max_thirst = NeedColumn("thirst", "maximum")
+    max_bladder = NeedColumn("bladder", "maximum")
+    max_bowels = NeedColumn("bowels", "maximum")
+    max_energy = NeedColumn("energy", "maximum")
+    max_work = NeedColumn("work", "maximum")
+    max_mood = NeedColumn("mood", "maximum")
+
     def __init__(self, needs, social, hunger, thirst, bladder, bowels, energy, gender, job, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.needs = needs
+        self.need_row = self.game.need_store.add(self, needs)
 
         self.social = social
         self.hunger = hunger
@@ -35,16 +66,23 @@ class Mob(BaseObject):
         # - satisfying: The goal to be fulfilled upon usage
         # - occupying: The item the worker is currently using
         # - waiting: Allows coworker to wait, for a time, while their path clears
+        # - steps: (x, y, tick) steps reserved ahead along path, so coworkers plan around each other
+        # - path_requested: Waiting on GameInstance to solve the path to target
         # - memories: Stores experiances of the coworker
-        self.target = None
+        # - modifiers: Trait and thought layers on stats
+        self._target = None
         self.target_job = None
         self.satisfying = None
         self.occupying = None
         self.waiting = 0
+        self.steps = []
+        self.path_requested = False
         self.memories = Memories(self)
+        self.modifiers = StatModifiers(self)
+        self.traits = kwargs.get("traits", [])
 
         self.fired = False
-        self._occupied = 0
+        self.busy_until = 0
 
         self.max_social = 100
         self.max_hunger = 100
@@ -63,27 +101,41 @@ class Mob(BaseObject):
         self.bladder_drain = -2
         self.bowels_drain = -1
         self.energy_drain = -1
-
-        self.mood_drain = 0
         self.work_drain = -1
+        self.mood_drain = 0
 
         phone_params = game_objects["Cellphone"]
         phone_params.update({"game": self.game, "x": 0, "y": 0})
         phone = Item(**phone_params)
         self.inventory.append(phone)
 
+        self.game.need_store.start(self.need_row)
+
+        # Traits scale stats for good
+        for trait in self.traits:
+            trait_def = game_traits[trait]
+            self.modifiers.add(Modifier(trait, trait_def["target_stat"], mult=trait_def["modifier"]))
+
+    @property
+    def target(self):
+        return self._target
+
+    @target.setter
+    def target(self, value):
+        # GameInstance keeps count of who's headed for what, so others are matched elsewhere
+        self.game.claim_target(self, self._target, value)
+        self._target = value
+
     @property
     def occupied(self):
-        return self._occupied
+        # Turns left until free.  Kept as the turn the Mob is busy until, so nothing ticks it down
+        return max(self.busy_until - self.game.turns, 0)
 
     @occupied.setter
     def occupied(self, value):
-        # Occupied floors at zero.  Increased by performing actions and ticks down once with needs check
-        self._occupied = max(value, 0)
-        if self._occupied:
-            self.char = '?'
-        else:
-            self.char = '@'
+        # Occupied floors at zero.  Increased by performing actions, whose durations pile on one another
+        self.busy_until = self.game.turns + max(value, 0)
+        self.char = '?' if self.occupied else '@'
 
     def get_tasks(self):
         # Returns current tasks from Memories
@@ -93,6 +145,7 @@ class Mob(BaseObject):
         # Adds job to Memories.  Called by GameInstance when looking for candidates for WorkRequests
         job.assignee = self
         self.memories.work_tasks.append(job)
+        self.game.wake(self)
 
     def remove_task(self):
         # Removes job from Memories, notifies GameInstance, and resets target_job.  Called by WorkRequest
@@ -107,58 +160,84 @@ class Mob(BaseObject):
         self.broadcast(f"{self.name} Finished {action.name}", action.color)
         self.game.complete_action(action)
         self.target = None
+        if not self.occupied:
+            self.char = '@'
+        self.game.wake(self)
+
+    def drop_steps(self):
+        # Gives up reserved steps, as when the path they were leading along changes
+        self.steps = []
+        self.game.release_steps(self)
 
     def broken_target(self, obj):
         # Marks target as broken in memory and clears target
         self.memories.add_broken(obj)
         self.target = None
+        self.game.wake(self)
+
+    def look_around(self):
+        # Broken things in sight are remembered, so they aren't headed for
+        for obj in self.game.game_map.fov_map.seen_objects(self):
+            if obj.broken and obj not in self.memories.broken_items:
+                self.memories.add_broken(obj)
 
-    def determine_closest(self, targets):
+    def usable_target(self, target):
         """
-        Determines closest target from list that could satisfy needs and isn't occupied.
+        Whether target could be used to satisfy needs.  Passed to GameInstance when searching
+        - Unowned or owned by this coworker
+        - Not currently in use, or already claimed by as many others as it takes, and not known to be broken
+        """
+        if target.owner and target.owner is not self:
+            return False
+
+        # If target currently in use, skip it
+        if target.occupied_by:
+            return False
+
+        if self.game.claimed(target, self):
+            return False
+
+        # If target is known to be broken, skip it
+        return target not in self.memories.broken_items
+
+    def determine_closest(self, need):
+        """
+        Determines closest target that could satisfy need and isn't occupied.
         - Pathing in GameInstance can reject blocked targets as well if the situation changes
         - determine_closest only called when no target is held or when it was bad
         """
-        min_distance = None
-        closest = None
-        targets = filter(lambda x: not x.owner or x.owner is self, targets)
-        for target in targets:
-            # If target currently in use, skip it
-            if target.occupied_by:
-                print(f"{target.name}: {target.x},{target.y} occupied by {target.occupied_by.name}")
-                continue
-
-            # If target is known to be broken, skip it
-            if target in self.memories.broken_items:
-                continue
-
-            dx = target.x - self.x
-            dy = target.y - self.y
-            distance = math.sqrt(dx**2 + dy**2)
-            if min_distance is None or distance < min_distance:
-                min_distance = distance
-                closest = target
-
-        return closest
+        return self.game.find_closest(self, need)
 
     def calculate_target_path(self):
         """
-        Asks GameInstance for path to target. If target now blocked, nothing will be returned.
-        If its a bum target, add to memories as broken for now
+        Asks GameInstance for path to target.  Paths are solved together once every coworker has decided,
+        and handed back through set_target_path
         """
-        self.path = self.game.find_path(self, self.target)
-        if not self.path:
+        self.drop_steps()
+        self.path = []
+        self.path_requested = True
+        self.game.request_path(self)
+
+    def set_target_path(self, path):
+        """
+        Called by GameInstance with the solved path.  If target now blocked, nothing will be returned.
+        If its a bum target, add to memories as broken for now.  An empty path means we're already there
+        """
+        self.path_requested = False
+        self.path = path
+        if self.path is None:
+            self.path = []
             print(f"{self.name} can't path to {self.target.name} {self.target.x}, {self.target.y}")
             self.broken_target(self.target)
-            self.target = None
 
     def check_needs(self):
         """
         Called every turn by take_turn. If not currently satsifying a need with a valid target in mind,
         determine lowest need and find something to fix it.
         - Inventory will be evaluated first to see if they have something for it
-        - If looking for work and a task has been assiged, that will be pursued.  Otherwise, the closest
-          unoccupied thing that satisfies will be picked and a path returned
+        - If looking for work and a task has been assiged, that will be pursued.  Otherwise GameInstance
+          is asked for something that satisfies.  It's matched along with everyone else seeking this
+          turn and handed back through set_need_target
         - If a bad target was previously acquired (considered broken) that'll be dropped from evaluation
           - bad targets: Unable to path
         """
@@ -180,73 +259,56 @@ class Mob(BaseObject):
 
             if self.satisfying == "work" and self.get_tasks():
                 task = self.get_tasks()[0]
-                self.target = task.target
                 self.target_job = task
+                self.set_need_target(task.target)
             else:
-                targets = self.game.find_need(self.satisfying)
-                self.target = self.determine_closest(targets)
+                self.game.seek_need(self, self.satisfying)
 
-            if not self.target:
-                print(f"{self.name} can't satisfy {self.satisfying}")
-            else:
-                self.state = f"satisfying {self.satisfying}"
-                self.calculate_target_path()
+    def set_need_target(self, target, path=None):
+        """
+        Takes up target for satisfying.  Called by GameInstance with what it matched.  path is given when
+        already known, otherwise it's asked for.  With nothing found the coworker rests until woken
+        """
+        if not target:
+            print(f"{self.name} can't satisfy {self.satisfying}")
+            self.game.rest(self)
+            return None
+
+        self.target = target
+        self.state = f"satisfying {self.satisfying}"
+        if path is None:
+            self.calculate_target_path()
+        else:
+            self.path = path
+            self.drop_steps()
 
     def tick_needs(self):
         """
         Controls Mob state throught time
-        - Frees up worker occupation
-        - Ticks Mob Memories
-        - Ticks Mob needs every four turns
-          - Processes Special events as certain stats tank
+        - Ticks Mob Memories every need tick
+        - Needs themselves are worked out on read.  GameInstance runs their events (mood changing
+          course, accidents, getting fired or quitting) on the tick they happen
         """
-        # If not preoccupied, check needs and do stuff
-        if not self.game.turns % 6:
+        if not self.game.turns % NEEDS_INTERVAL:
             self.memories.tick_memories()
-            self.mood_drain = 0
-            for need in self.needs:
-                # Mood is ticked last - dependent on others
-                if need == "mood":
-                    continue
-                setattr(self, need, max(getattr(self, f"{need}_drain") + getattr(self, need), 0))
-                if getattr(self, need) == 0:
-                    self.mood_drain -= 1
-            else:
-                # If mood's not currently draining, increase mood equal to stats 75% filled
-                if not self.mood_drain:
-                    positives = [x for x in self.needs if getattr(self, need) > 75]
-                    self.mood = min(len(positives) + self.mood, 100)
-
-            # Draining mood based on unfufilled needs
-            self.mood += self.mood_drain
-            if self.work <= 0:
-                self.mob_fired()
-
-            if self.mood <= 0:
-                self.mob_quits()
-
-            if self.bladder <= 0:
-                urine = game_objects["Urine"]
-                self.game.create_object(self.x, self.y, urine)
-                self.bladder = self.max_bladder
-
-            if self.bowels <= 0:
-                poo = game_objects["Poo"]
-                self.game.create_object(self.x, self.y, poo)
-                self.bowels = self.max_bowels
-
-    def take_turn(self):
+
+    def take_turn(self, decide=True):
         """
         Main AI Method called by GameInstance for each turn
         - Ticks Needs/Handles worker state
+        - decide: Whether GameInstance woke the coworker for a decision pass.  Otherwise it carries on
+          with what it was doing (occupied, or walking to target) and the rest is skipped
         - Checks Inventory
         - Frees up Mob as it's occupying action is performed
-        - Check whether occupied and, if not, do things
+        - Check whether occupied and, if not, decide what to do.  Moving waits for take_move
         """
         if self.fired:
             return None
 
         self.tick_needs()
+        if not decide:
+            return None
+
         # TODO: Currently dropping Trash, stuff that doesn't satisfy, where ever
         # May want to look for Trash Can at some point
         # Dropping first Trash item found when inventory full
@@ -257,29 +319,54 @@ class Mob(BaseObject):
                 self.drop_item(t)
                 break
 
-        # If not preoccupied, check needs and do stuff
+        # If not preoccupied, look around, check needs and do stuff
         if not self.occupied:
+            self.look_around()
             self.check_needs()
-            self.move_to_target()
+        self.game.decided(self)
+
+    def take_move(self):
+        """
+        Called by GameInstance for each turn once all paths are solved
+        - Moves towards or uses target
+        """
+        if self.fired or self.occupied:
+            return None
+        self.move_to_target()
 
     def move_to_target(self):
-        if not self.target:
+        # Nothing to do without a target, or until GameInstance has solved the path to it
+        if not self.target or self.path_requested:
             return None
 
         # Dest. has been reached -> use target, clear state
         if not self.path:
+            self.drop_steps()
             next_tile = self.game.get_tile(self.target.x, self.target.y)
             self.move(next_tile, arrived=True)
             self.state = ""
             return None
 
-        # Will be standard Move
-        next_tile = self.game.get_tile(*self.path[0])
-        if not next_tile.blocked:
-            self.move(next_tile)
+        # Steps are reserved a window ahead and replanned once half used, so others see where we're going.
+        # Conflicts are settled while planning: a planned step may be a wait or sidestep to let someone by
+        turn = self.game.turns
+        self.steps = [x for x in self.steps if x[2] >= turn]
+        if len(self.steps) <= RESERVATION_WINDOW // 2:
+            self.steps = self.game.reserve_steps(self)
 
-        # Will wait or try to swap places with blocking coworker
-        else:
+        next_x, next_y = self.steps.pop(0)[:2] if self.steps else (self.x, self.y)
+
+        # Otherwise waiting in place, as planned or when boxed in
+        if (next_x, next_y) != (self.x, self.y):
+            next_tile = self.game.get_tile(next_x, next_y)
+
+            # Will be standard Move
+            if not next_tile.blocked:
+                self.move(next_tile)
+                self.waiting = 0
+                return None
+
+            # Something unplanned is in the way (the player).  Will wait or try to swap places with blocking coworker
             blockers = [x for x in next_tile.contents if x.blocks]
             if len(blockers) == 1 and isinstance(blockers[0], Mob):
                 coworker = blockers[0]
@@ -287,13 +374,16 @@ class Mob(BaseObject):
                     print(f"{self.name} swapped with {coworker.name}...")
                     coworker.move(self.game.get_tile(*coworker.path[0]), swapping=True)
                     self.move(next_tile, swapping=True)
-
-            self.waiting += 1
-            if self.waiting == 4:
-                print(f"{self.name} is recalcing...")
-                self.calculate_target_path()
-            else:
-                print(f"{self.name} is waiting...")
+                    coworker.drop_steps()
+            self.drop_steps()
+
+        self.waiting += 1
+        if self.waiting >= 4:
+            print(f"{self.name} is recalcing...")
+            self.waiting = 0
+            self.calculate_target_path()
+        else:
+            print(f"{self.name} is waiting...")
 
     def move(self, dest_tile, swapping=False, arrived=False):
         """
@@ -306,16 +396,12 @@ class Mob(BaseObject):
         """
         # Standard Move action.  GameInstance will be notified
         if (not dest_tile.blocked or swapping) and not arrived:
-            self.game.remove_tile_content(self)
-            self.x = dest_tile.x
-            self.y = dest_tile.y
-            self.game.add_tile_content(self)
+            self.game.move_object(self, dest_tile.x, dest_tile.y)
 
-            # Wrapped pop in a try as player won't have a path
-            try:
-                self.path.pop(0)
-            except IndexError:
-                pass
+            # Drops path up to the new position.  Planned steps may sidestep, so it isn't always the head.
+            # Player won't have a path
+            if (self.x, self.y) in self.path:
+                del self.path[:self.path.index((self.x, self.y)) + 1]
 
         # Reached end of path or was player directed.
         # Will now use target object/resolve request
@@ -345,7 +431,9 @@ class Mob(BaseObject):
         self.broadcast(self.name.capitalize() + " is fired!", "orange")
         self.char = "%"
         self.color = colors["dark_red"]
-        self.blocks = False
+        self.drop_steps()
+        self.target = None
+        self.game.set_blocks(self, False, blocks_sight=False)
         self.name = "remains of " + self.name
         self.state = "fired"
         self.fired = True
@@ -354,7 +442,9 @@ class Mob(BaseObject):
         self.broadcast(self.name.capitalize() + " quits!", "orange")
         self.char = "%"
         self.color = colors["dark_red"]
-        self.blocks = False
+        self.drop_steps()
+        self.target = None
+        self.game.set_blocks(self, False, blocks_sight=False)
         self.name = "remains of " + self.name
         self.state = "fired"
         self.fired = True
@@ -0,0 +1,56 @@
+from operator import attrgetter
+from random import randint
+
+
+def clamp_stat(value, mod):
+    # Lowering a stat floors it at 0, raising it caps it at 100
+    if mod < 0:
+        return int(max(value + mod, 0))
+    return int(min(value + mod, 100))
+
+
+def compile_exec(source):
+    # Wraps an exec snippet, which sets ret from app_target, as a function returning ret
+    body = "\n".join(f"    {line}" for line in source.splitlines())
+    namespace = {"randint": randint}
+    exec(f"def effect(app_target):\n    ret = 0\n{body}\n    return ret", namespace)
+    return namespace["effect"]
+
+
+def compile_effect(effect):
+    """
+    Turns an effect def from actions.json into a function of the resolving Action.  Done once as defs load
+     - actor_stat/target_stat: Stat changed on the Action's actor or target.  For work requests, the
+       target is the object the request is for
+     - new_value: Sets the stat
+     - modifier: Added to the stat, clamped
+     - exec: Python setting ret from app_target, added to the stat, clamped
+    """
+    if effect.get("actor_stat"):
+        get_target = attrgetter("actor")
+        stat = effect.get("actor_stat")
+    else:
+        get_target = attrgetter("effect_target")
+        stat = effect.get("target_stat")
+
+    if effect.get("new_value"):
+        value = effect.get("new_value")
+
+        def apply(action):
+            setattr(get_target(action), stat, value)
+
+    elif effect.get("modifier"):
+        mod = effect.get("modifier")
+
+        def apply(action):
+            app_target = get_target(action)
+            setattr(app_target, stat, clamp_stat(getattr(app_target, stat, 0), mod))
+
+    else:
+        get_mod = compile_exec(effect.get("exec"))
+
+        def apply(action):
+            app_target = get_target(action)
+            setattr(app_target, stat, clamp_stat(getattr(app_target, stat, 0), get_mod(app_target)))
+
+    return apply
@@ -0,0 +1,124 @@
+import numpy as np
+import tcod
+
+# Step costs used by distance fields.  Diagonals cost more so paths stay natural looking
+CARDINAL_COST = 2
+DIAGONAL_COST = 3
+UNREACHED = np.iinfo(np.int32).max
+
+
+def distance_field(seeds, mask):
+    """ Dijkstra field from seed cells over mask (bool array of passable cells, or step costs with 0 blocking) """
+    dist = np.full(mask.shape, UNREACHED, dtype=np.int32)
+    for x, y in seeds:
+        dist[x, y] = 0
+    cost = mask.astype(np.int8) if mask.dtype == bool else mask
+    tcod.path.dijkstra2d(dist, cost, CARDINAL_COST, DIAGONAL_COST, out=dist)
+    return dist
+
+
+def descend(dist, start):
+    """ Path from start down the field to its nearest seed, start included """
+    return [tuple(p) for p in tcod.path.hillclimb2d(dist, start, True, True).tolist()]
+
+
+class NeedFields():
+    """
+    Dijkstra distance fields per need, shared by all coworkers
+     - Seeded from the free tiles around every usable (unowned, unbroken) object satisfying
+       the need.  Occupancy comes and goes too often to rebuild for, so occupied objects are
+       skipped when routing instead
+     - Fields are rebuilt lazily on read, and only when the seed cells or the map's static
+       passability changed since they were built.  The need's registry version tells when
+       the seeds are worth looking at again
+     - Mobs aren't treated as obstacles.  Coworkers already wait/swap/recalc around each other
+     - Single objects get fields of their own too, for matching several seekers at once
+    """
+    def __init__(self, game):
+        self.game = game
+        self.fields = {}
+        self.object_fields = {}
+        self.rebuilds = 0
+
+    @staticmethod
+    def seeds_from(obj):
+        return not obj.owner and not obj.broken
+
+    def get_field(self, need):
+        static_version = self.game.game_map.static_version
+        version = self.game.need_index.versions.get(need, 0)
+        cached = self.fields.get(need)
+        if cached and cached[:2] == (static_version, version):
+            return cached[3]
+
+        seeds = []
+        for obj in self.game.find_need(need):
+            if self.seeds_from(obj):
+                seeds += self.free_around(obj)
+        seeds = sorted(set(seeds))
+        if cached and cached[0] == static_version and cached[2] == seeds:
+            self.fields[need] = (static_version, version, seeds, cached[3])
+            return cached[3]
+
+        dist = distance_field(seeds, self.passable())
+        self.fields[need] = (static_version, version, seeds, dist)
+        self.rebuilds += 1
+        return dist
+
+    def object_field(self, obj):
+        # Field from the free tiles around obj.  Kept until obj moves or static passability changes
+        version = (self.game.game_map.static_version, obj.x, obj.y)
+        cached = self.object_fields.get(obj)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        dist = distance_field(self.free_around(obj), self.passable())
+        self.object_fields[obj] = (version, dist)
+        self.rebuilds += 1
+        return dist
+
+    def passable(self):
+        return np.logical_not(self.game.game_map.grid.static_blocked)
+
+    def free_around(self, obj):
+        # Statically passable tiles next to obj, where fields are seeded from
+        grid = self.game.game_map.grid
+        return [
+            (x, y) for x, y in self.game.get_tile(obj.x, obj.y).adjacent()
+            if grid.in_bounds(x, y) and not grid.static_blocked[x, y]
+        ]
+
+    def forget(self, obj):
+        self.object_fields.pop(obj, None)
+
+    def distance(self, need, x, y):
+        # Walking distance (in step costs) to the nearest usable object, None if unreachable
+        dist = self.get_field(need)[x, y]
+        return None if dist == UNREACHED else int(dist)
+
+    def next_step(self, need, x, y):
+        # Neighbouring tile that's one step closer, None if already there or unreachable
+        field = self.get_field(need)
+        best = None
+        best_dist = field[x, y]
+        for nx, ny in self.game.get_tile(x, y).adjacent():
+            if self.game.game_map.grid.in_bounds(nx, ny) and field[nx, ny] < best_dist:
+                best, best_dist = (nx, ny), field[nx, ny]
+        return best
+
+    def route(self, seeker, need):
+        """
+        Returns (target, path) for seeker by descending the need's field, or None if the
+        nearest usable object by walking distance isn't one seeker would accept, occupied included
+        """
+        field = self.get_field(need)
+        if field[seeker.x, seeker.y] == UNREACHED:
+            return None
+
+        path = descend(field, (seeker.x, seeker.y))
+        end_x, end_y = path[-1]
+        for x, y in self.game.get_tile(end_x, end_y).adjacent():
+            for obj in self.game.get_tile(x, y).contents:
+                if need in getattr(obj, "satisfies", ()) and self.seeds_from(obj) and seeker.usable_target(obj):
+                    return obj, path[1:]
+        return None
@@ -1,11 +1,23 @@
+import heapq
 import random
+from itertools import count
+
+import numpy as np
 
 from tcod.event import EventDispatch
 from base.enums import ObjType
 from base.items import BaseObject, Item, Vendor, Action
-from base.thoughts import WorkRequest
+from base.thoughts import WorkRequest, Thought
 from base.coworker import Mob
+from base.registry import ObjectRegistry, NeedRegistry, RequestBoard, SpatialHash
+from base.fields import NeedFields, UNREACHED
+from base.needs import NeedStore
+from base.auras import AuraField
+from base.reservations import ReservationTable
 from constants import (
+    NEEDS_INTERVAL,
+    AURA_RADIUS,
+    RESERVATION_WINDOW,
     female_names,
     male_names,
     game_objects,
@@ -35,6 +47,9 @@ key_map = {
     1073741923: "numPeriod"
 }
 
+# Object types searched when satisfying needs
+need_types = (ObjType.appliance, ObjType.vendor, ObjType.item)
+
 
 class Dispatcher(EventDispatch):
     def __init__(self, game):
@@ -95,16 +110,39 @@ class Cursor():
 
 class GameInstance():
     def __init__(self):
-        self.world_objs = {
-            ObjType.static: [],
-            ObjType.appliance: [],
-            ObjType.vendor: [],
-            ObjType.item: [],
-            ObjType.mob: []
-        }
-        self.actions = []
-        self.emitters = []
-        self.work_requests = []
+        self.world_objs = ObjectRegistry()
+        self.need_index = NeedRegistry()
+        self.need_fields = NeedFields(self)
+        self.need_store = NeedStore(self)
+        # Where mobs are, for "who's near me" queries
+        self.mob_index = SpatialHash()
+        # Auras given off by objects, as intensity grids coworkers read where they stand
+        self.auras = AuraField(self, AURA_RADIUS)
+        self.reservations = ReservationTable()
+        self.path_requests = {}
+        # need_requests: coworkers seeking something for a need this turn.  claims: object -> coworkers
+        # targeting it
+        self.need_requests = {}
+        self.claims = {}
+
+        # AI wakeups: coworkers only get a decision pass once woken by something worth reacting to.
+        # wakeups: heap of (turn, seq, coworker), with wakeup_turns holding each coworker's earliest
+        # queued turn.  idle: coworkers left with nothing to do
+        self.awake = set()
+        self.wakeups = []
+        self.wakeup_turns = {}
+        self.wakeup_seq = count()
+        self.idle = set()
+        self.decisions = 0
+
+        # Stat modifiers that wear off: heap of (turn, seq, stat modifiers, modifier)
+        self.expiries = []
+
+        # actions: live Actions, as an ordered set.  action_queue: heap of (due turn, seq, action).
+        # Cancelled actions leave the set and are skipped when they come up
+        self.actions = {}
+        self.action_queue = []
+        self.work_requests = RequestBoard()
 
         self.game_msgs = []
         self.turns = 0
@@ -119,46 +157,272 @@ class GameInstance():
     def run_coworkers(self):
         if not self.popup_open:
             self.turns += 1
+            self.run_needs()
+            self.expire_modifiers()
+            self.game_map.update_traffic()
+            self.apply_auras()
             self.assign_requests()
-            for action in self.actions:
-                action.tick_action()
+            self.run_actions()
 
+            while self.wakeups and self.wakeups[0][0] <= self.turns:
+                turn, _, mob = heapq.heappop(self.wakeups)
+                if self.wakeup_turns.get(mob) == turn:
+                    del self.wakeup_turns[mob]
+                self.wake(mob)
+
+            # Coworkers woken since last turn decide first, asking for paths as they pick targets.
+            # Paths are then solved together and everyone moves
+            workers = []
             for worker in self.world_objs[ObjType.mob]:
                 if worker is self.player:
                     if not self.player.fired:
                         worker.tick_needs()
                     continue
-                worker.take_turn()
+                worker.take_turn(decide=worker in self.awake)
+                workers.append(worker)
+
+            self.assign_needs()
+            self.solve_paths()
+            for worker in workers:
+                worker.take_move()
+
+    def run_needs(self):
+        # Needs are worked out on read.  Each need tick, only mobs with something happening are settled
+        if not self.turns % NEEDS_INTERVAL:
+            self.need_store.settle(self.turns // NEEDS_INTERVAL)
+
+    def apply_auras(self):
+        """
+        Coworkers standing in an aura, and seeing where it comes from, have its thought, scaled by the
+        aura's intensity there.  All positions are read from the grids at once.  Thoughts already held
+        run their course
+        """
+        if not self.auras:
+            return None
+        mobs = [x for x in self.mob_index if x is not self.player and not x.fired]
+        if not mobs:
+            return None
+        xs = np.fromiter((x.x for x in mobs), dtype=np.intp, count=len(mobs))
+        ys = np.fromiter((x.y for x in mobs), dtype=np.intp, count=len(mobs))
+        sight = self.game_map.fov_map
+        for aura, intensity in self.auras.sample(xs, ys).items():
+            sources = None
+            for i in np.flatnonzero(intensity > 0):
+                mob = mobs[i]
+                if mob.memories.has_thought(aura):
+                    continue
+                sources = sources or self.auras.sources(aura)
+                if not any(sight.sees(mob, x, y) for x, y in sources):
+                    continue
+                params = dict(game_auras[aura])
+                params["modifier"] *= min(intensity[i].item(), 1)
+                mob.memories.add_thought(Thought(**params))
+
+    def expire_at(self, modifiers, modifier):
+        heapq.heappush(self.expiries, (modifier.expires, next(self.wakeup_seq), modifiers, modifier))
+
+    def expire_modifiers(self):
+        # Layers removed early are skipped
+        while self.expiries and self.expiries[0][0] <= self.turns:
+            _, _, modifiers, modifier = heapq.heappop(self.expiries)
+            modifiers.remove(modifier)
+
+    def wake(self, mob):
+        # Gives mob a decision pass next turn.  Called as things it would react to happen
+        self.awake.add(mob)
+
+    def wake_at(self, mob, turn):
+        # Already due to wake by then: nothing to add
+        queued = self.wakeup_turns.get(mob)
+        if queued is not None and queued <= turn:
+            return None
+        self.wakeup_turns[mob] = turn
+        heapq.heappush(self.wakeups, (turn, next(self.wakeup_seq), mob))
+
+    def wake_idle(self, satisfies):
+        # Wakes idle coworkers after any of satisfies
+        self.awake |= {x for x in self.idle if x.satisfying in satisfies}
+
+    def decided(self, mob):
+        """
+        Called by coworkers after their decision pass.  Those still without anything to do stay
+        idle until their needs next tick, or something they could use frees up
+        """
+        self.awake.discard(mob)
+        self.idle.discard(mob)
+        self.decisions += 1
+        if not mob.target and not mob.occupied and not mob.fired and mob not in self.need_requests:
+            self.rest(mob)
+
+    def rest(self, mob):
+        self.idle.add(mob)
+        self.wake_at(mob, self.turns + NEEDS_INTERVAL - self.turns % NEEDS_INTERVAL)
 
     def assign_requests(self):
-        unassigned = filter(lambda x: x.assignee is None, self.work_requests)
-        for job in unassigned:
-            candidates = sorted(
-                filter(lambda x: x.job == job.job, self.world_objs[ObjType.mob]), key=lambda x: len(x.get_tasks())
-            )
-            for c in candidates:
-                c.add_task(job)
-                break
-            else:
-                print(f"No candidate found for {job.name} of {job.target.name}")
+        for job, worker in self.work_requests.assign():
+            worker.add_task(job)
 
     def complete_request(self, job):
-        self.work_requests = [x for x in self.work_requests if x is not job]
-        del job
+        self.work_requests.complete(job)
 
     def find_need(self, need):
-        satisfies = []
-        for obj_type in [ObjType.appliance, ObjType.vendor, ObjType.item]:
-            for obj in self.world_objs[obj_type]:
-                if need in obj.satisfies:
-                    satisfies.append(obj)
+        return self.need_index.find(need)
+
+    def find_closest(self, seeker, need):
+        # Nearest placed object satisfying need that the seeker can reach and would accept
+        def accept(obj):
+            return self.game_map.can_reach(seeker, obj) and seeker.usable_target(obj)
+
+        return self.need_index.nearest(need, seeker.x, seeker.y, accept=accept)
+
+    def route_to_need(self, seeker, need):
+        # Target and path from the shared distance field of need, if one suits the seeker
+        return self.need_fields.route(seeker, need)
+
+    def nearest_mobs(self, mob, count, accept=None):
+        # Up to count other coworkers still on the job, nearest first
+        def keep(other):
+            return other is not mob and not other.fired and (not accept or accept(other))
 
-        return satisfies
+        return self.mob_index.k_nearest(mob.x, mob.y, count, accept=keep)
+
+    def mobs_near(self, mob, radius, accept=None):
+        # Other coworkers still on the job within radius of mob
+        def keep(other):
+            return other is not mob and not other.fired and (not accept or accept(other))
+
+        return self.mob_index.within(mob.x, mob.y, radius, accept=keep)
+
+    def seek_need(self, seeker, need):
+        # Queues seeker for something satisfying need, matched with the turn's other seekers in assign_needs
+        self.need_requests[seeker] = need
+
+    def claim_target(self, mob, old, new):
+        # Tracks who's headed for what, and drops searches kept for old targets.  Called by coworkers
+        # as their target changes
+        if old is new:
+            return None
+        self.game_map.forget_seeker(mob)
+        if old is not None:
+            claimants = self.claims.get(old)
+            claimants.discard(mob)
+            if not claimants:
+                del self.claims[old]
+            # Coworkers idle for want of something like it may get it now
+            self.wake_idle(getattr(old, "satisfies", None) or ())
+        if new is not None:
+            self.claims.setdefault(new, set()).add(mob)
+
+    def claimed(self, obj, mob):
+        # Whether others have obj's capacity claimed
+        claimants = self.claims.get(obj, ())
+        return len(claimants) - (mob in claimants) >= obj.capacity
+
+    def assign_needs(self):
+        """
+        Finds something for each coworker seeking a need this turn, before paths are solved
+         - Lone seekers take the nearest by walking distance from the shared need field, falling back
+           to straight-line search when that one won't do
+         - Seekers after the same need are matched together: nearest pairs first by walking distance,
+           without giving any object more coworkers than its capacity
+        """
+        requests, self.need_requests = self.need_requests, {}
+        by_need = {}
+        for seeker, need in requests.items():
+            # Something else came up since asking
+            if seeker.target or seeker.fired:
+                continue
+            by_need.setdefault(need, []).append(seeker)
+
+        for need, seekers in by_need.items():
+            if len(seekers) == 1:
+                seeker = seekers[0]
+                route = self.route_to_need(seeker, need)
+                if route:
+                    seeker.set_need_target(*route)
+                else:
+                    seeker.set_need_target(seeker.determine_closest(need))
+                continue
+
+            matches = self.match_need(need, seekers)
+            for seeker in seekers:
+                seeker.set_need_target(matches.get(seeker))
+
+    def match_need(self, need, seekers):
+        """
+        Greedy matching of seekers to usable objects satisfying need.  Returns seeker -> object
+         - Walking distances come from each object's own distance field, kept between turns
+         - Objects keep the capacity left over from coworkers already headed for them
+        """
+        candidates = [x for x in self.find_need(need) if not x.broken and not x.occupied_by]
+        capacity = {x: x.capacity - len(self.claims.get(x, ())) for x in candidates}
+        candidates = [x for x in candidates if capacity[x] > 0]
+
+        pairs = []
+        for obj in candidates:
+            field = self.need_fields.object_field(obj)
+            for order, seeker in enumerate(seekers):
+                dist = field[seeker.x, seeker.y]
+                if dist != UNREACHED and seeker.usable_target(obj):
+                    pairs.append((int(dist), order, seeker, obj))
+
+        matches = {}
+        for _, _, seeker, obj in sorted(pairs, key=lambda x: x[:2]):
+            if seeker in matches or not capacity[obj]:
+                continue
+            matches[seeker] = obj
+            capacity[obj] -= 1
+        return matches
+
+    def object_changed(self, obj):
+        # Called by objects as their usable state changes (occupied, broken)
+        if obj.type in need_types:
+            self.need_index.touch(obj)
+            # Idle coworkers after what it satisfies may be able to use it now
+            self.wake_idle(getattr(obj, "satisfies", None) or ())
 
     def find_path(self, seeker, target):
         # Routes path requests of Workers to MapGenerator
         return self.game_map.find_path(seeker, target)
 
+    def request_path(self, seeker):
+        # Queues seeker for a path to its target, solved with the rest in solve_paths
+        self.path_requests[seeker] = seeker.target
+
+    def solve_paths(self):
+        """
+        Solves the tick's path requests in one pass, before anyone moves.  Requests are grouped by
+        target so coworkers after the same appliance share a search
+        """
+        requests, self.path_requests = self.path_requests, {}
+        by_target = {}
+        for seeker, target in requests.items():
+            # Dropped the target since asking
+            if seeker.target is not target:
+                seeker.path_requested = False
+                continue
+            by_target.setdefault(target, []).append(seeker)
+
+        for target, seekers in by_target.items():
+            for seeker, path in zip(seekers, self.game_map.find_paths(seekers, target)):
+                seeker.set_target_path(path)
+
+    def reserve_steps(self, mob):
+        """
+        Reserves the mob's next steps along its path, or plans them around the steps other coworkers
+        have reserved towards a waypoint on it if they'd conflict.  Returns the reserved (x, y, tick) steps
+        """
+        start = (mob.x, mob.y)
+        grid = self.game_map.grid
+        steps = self.reservations.follow(mob, start, mob.path, self.turns, grid, RESERVATION_WINDOW)
+        if steps is None:
+            waypoint = mob.path[min(len(mob.path), RESERVATION_WINDOW) - 1]
+            steps = self.reservations.plan(mob, start, waypoint, self.turns, grid, RESERVATION_WINDOW)
+        return self.reservations.reserve(mob, start, steps, self.turns)
+
+    def release_steps(self, mob):
+        self.reservations.release(mob)
+
     def player_move_or_use(self, mod_x, mod_y):
         if self.player.occupied:
             return None
@@ -176,20 +440,44 @@ class GameInstance():
         return self.game_map.get_adjacent_tiles(obj)
 
     def add_tile_content(self, obj):
-        # Communicates tile content change to MapGenerator which then updates path_map
+        # Communicates tile content change to MapGenerator, which passes blocked state flips on to pathing
         self.game_map.place_object(obj)
-        self.world_objs[obj.type].append(obj)
+        self.world_objs.add(obj)
+        if obj.type in need_types:
+            self.need_index.add(obj)
+        if obj.type == ObjType.mob:
+            self.mob_index.add(obj, obj.x, obj.y)
+        if obj.emits:
+            for aura in [obj.emits] if isinstance(obj.emits, str) else obj.emits:
+                self.auras.add(obj, aura, radius=game_auras[aura].get("radius"))
+
+    def move_object(self, obj, x, y):
+        # Communicates move to MapGenerator.  Object stays registered throughout
+        self.game_map.move_object(obj, x, y)
+        if obj in self.mob_index:
+            self.mob_index.move(obj, x, y)
+
+    def set_blocks(self, obj, blocks, blocks_sight=None):
+        # Communicates blocking change to MapGenerator so tile blocker counts stay in sync
+        self.game_map.set_blocks(obj, blocks, blocks_sight)
 
     def remove_tile_content(self, obj):
-        # Communicates tile content change to MapGenerator which then updates path_map
+        # Communicates tile content change to MapGenerator, which passes blocked state flips on to pathing
         self.game_map.remove_object(obj)
-        self.world_objs[obj.type] = list(filter(lambda x: x is not obj, self.world_objs[obj.type]))
+        self.world_objs.remove(obj)
+        if obj.type in need_types:
+            self.need_index.remove(obj)
+        self.mob_index.remove(obj)
+        self.game_map.fov_map.forget(obj)
+        self.game_map.forget_seeker(obj)
+        self.auras.remove(obj)
 
     def delete_object(self, obj, holder=None):
         if holder:
             obj.drop_from_inventory(holder)
 
         self.remove_tile_content(obj)
+        self.need_fields.forget(obj)
         self.submit_event(obj, getattr(obj, "on_destroy", {}))
         del obj
 
@@ -222,14 +510,36 @@ class GameInstance():
             if not action_obj:
                 print(f"Action not found {action}")
                 return None
-            action_obj.update({"name": action, "actor": actor, "target": target})
-            action_obj = Action(**action_obj)
-            self.actions.append(action_obj)
+            action_obj = Action(name=action, actor=actor, target=target, **action_obj)
+            self.actions[action_obj] = None
+            heapq.heappush(self.action_queue, (action_obj.due, next(self.wakeup_seq), action_obj))
+
+    def run_actions(self):
+        # Only actions due this turn are touched.  Those in progress cost nothing
+        while self.action_queue and self.action_queue[0][0] <= self.turns:
+            action = heapq.heappop(self.action_queue)[2]
+            if action in self.actions:
+                action.resolve_action()
 
     def complete_action(self, action):
-        self.actions = [x for x in self.actions if x is not action]
-        del self.renderer.action_cache[action]
-        del action
+        self.actions.pop(action, None)
+        self.renderer.action_cache.pop(action, None)
+
+    def cancel_action(self, action):
+        """
+        Drops action without resolving it and frees its target.  If it was the last piled on its actor,
+        the actor is spared the time left on it
+        """
+        if action not in self.actions:
+            return None
+        self.complete_action(action)
+        if not isinstance(action.target, WorkRequest):
+            action.target.occupied_by = None
+        actor = action.actor
+        if actor.busy_until == action.due:
+            actor.occupied = max(action.due - action.duration - self.turns, 0)
+            if not actor.occupied:
+                self.wake(actor)
 
     def submit_event(self, obj, event):
         if not event:
@@ -248,12 +558,11 @@ class GameInstance():
         '''
         job_request = work_requests.get(request)
         if job_request:
-            job_request.update({"game": self, "target": obj})
-            if (job_request["name"], job_request["target"]) in ((x.name, x.target) for x in self.work_requests):
+            if (job_request["name"], obj) in self.work_requests:
                 return None
 
-            job = WorkRequest(**job_request)
-            self.work_requests.append(job)
+            job = WorkRequest(game=self, target=obj, **job_request)
+            self.work_requests.post(job)
 
     def transform_object(self, obj, new):
         new = game_objects.get(new)
@@ -263,12 +572,14 @@ class GameInstance():
         else:
             print(f"New object not found: {new}")
 
-    def log_emitter(self, obj, thought):
-        # TODO: Implement emitted auras
-        # Auras passed as thoughts to workers when adjacent on emitter
-        # Need to handle auras on init but, more importantly, temporary
-        # state-based auras (i.e. on_dirty) - need to know when temps end
-        pass
+    def log_emitter(self, obj, aura):
+        # Temporary aura from a state based event (i.e. on_dirty), lasting until obj recovers
+        if getattr(obj, "holder", None):
+            return None
+        self.auras.add(obj, aura, radius=game_auras[aura].get("radius"), temporary=True)
+
+    def end_emitters(self, obj):
+        self.auras.remove(obj, temporary=True)
 
     def log_message(self, *args, **kwargs):
         self.renderer.log_message(*args, **kwargs)
@@ -305,6 +616,8 @@ class GameInstance():
             params["job"] = game_jobs[job]["name"]
 
         coworker = self.create_object(x, y, params)
+        self.work_requests.add_worker(coworker)
+        self.wake(coworker)
         return coworker
 
     # Sets up key_bindings
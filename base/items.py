@@ -1,4 +1,3 @@
-from random import randint
 from base.enums import ObjType
 from constants import colors, game_objects
 from base.thoughts import WorkRequest
@@ -35,36 +34,41 @@ def attrFormatter(attrs, obj, override={}, base=False):
 
 
 class Action():
-    def __init__(self, name, chars, color, actor, target, duration, effects=[], produces=None, consumes=None):
+    def __init__(
+        self, name, chars, color, actor, target, duration, effects=[], produces=None, consumes=None, satisfies=[]
+    ):
         self.name = name
         self.chars = chars
         self.color = color
         self.actor = actor
         self.target = target
         self.duration = duration
+        self.satisfies = satisfies
 
         self.effects = effects
         self.produces = produces
         self.consumes = consumes
 
         # Sets inital state of actor & target (if not work request)
-        # TODO: Currently allowing for multitasking.  Each Action should pile on to the user occupied attr
-        # (e.g. 4 + 2).  Though, they're all ticked essentially simultaneously, only once they're nolonger occupied
-        # will the actor resolve its actions
+        # Each Action piles on to the user occupied attr (e.g. 4 + 2) and is resolved by GameInstance
+        # on the turn it comes due, one after another
         # May want to keep like this since most things limited by proximity, but for some things could add
         # a blocking status.  Or maybe blocking not necessary since time stacks as it does prior to resolution
         self.actor.occupied += duration
+        self.due = self.actor.busy_until
         if not isinstance(self.target, WorkRequest):
             self.target.occupied_by = actor
 
-    def tick_action(self):
-        self.actor.occupied -= 1
-        if not self.actor.occupied:
-            self.resolve_action()
+    @property
+    def effect_target(self):
+        # What target_stat effects land on: the object a work request is for, otherwise the target
+        if isinstance(self.target, WorkRequest):
+            return self.target.target
+        return self.target
 
     def resolve_action(self):
         for effect in self.effects:
-            self.apply_effect(effect)
+            effect(self)
 
         if isinstance(self.target, WorkRequest):
             self.target.resolve_request()
@@ -74,31 +78,6 @@ class Action():
             self.target.eval_events()
             self.actor.finished_action(self)
 
-    def apply_effect(self, effect):
-        if effect.get("actor_stat"):
-            app_target = self.actor
-            app_stat = effect.get("actor_stat")
-        else:
-            app_target = self.target
-            app_stat = effect.get("target_stat")
-
-        if effect.get("new_value"):
-            setattr(app_target, app_stat, effect.get("new_value"))
-        elif effect.get("modifier"):
-            mod = effect.get("modifier")
-            if mod < 0:
-                setattr(app_target, app_stat, int(max(getattr(app_target, app_stat, 0) + mod, 0)))
-            else:
-                setattr(app_target, app_stat, int(min(getattr(app_target, app_stat, 0) + mod, 100)))
-        else:
-            exec_vars = {"app_target": app_target, "randint": randint, "ret": 0}
-            exec(effect.get("exec"), exec_vars)
-            mod = exec_vars["ret"]
-            if mod < 0:
-                setattr(app_target, app_stat, int(max(getattr(app_target, app_stat, 0) + mod, 0)))
-            else:
-                setattr(app_target, app_stat, int(min(getattr(app_target, app_stat, 0) + mod, 100)))
-
 
 class BaseObject():
     def __init__(self, game, name, x, y, char, color, obj_type, blocks=False, durability=100, **kwargs):
@@ -114,9 +93,11 @@ class BaseObject():
         if kwargs.get("blocks_sight"):
             self.blocks_sight = kwargs.get("blocks_sight")
 
-        self.occupied_by = None
-        self.durability = durability
-        self.cleanliness = 100
+        self._occupied_by = None
+        self._durability = durability
+        # Coworkers that can be headed for it at once
+        self.capacity = kwargs.get("capacity", 1)
+        self._cleanliness = 100
         self.state = ""
 
         self.emits = kwargs.get("emits")
@@ -129,9 +110,43 @@ class BaseObject():
         # Asks GameInstance 'What's Next to Me?
         return self.game.get_adjacent(self)
 
+    @property
+    def occupied_by(self):
+        return self._occupied_by
+
+    @occupied_by.setter
+    def occupied_by(self, value):
+        changed = (value is None) != (self._occupied_by is None)
+        self._occupied_by = value
+        if changed:
+            self.game.object_changed(self)
+
+    @property
+    def durability(self):
+        return self._durability
+
+    @durability.setter
+    def durability(self, value):
+        was_broken = self.broken
+        self._durability = value
+        if self.broken != was_broken:
+            self.game.object_changed(self)
+
+    @property
+    def cleanliness(self):
+        return self._cleanliness
+
+    @cleanliness.setter
+    def cleanliness(self, value):
+        # Cleaned up: auras it gave off while dirty stop
+        was_dirty = self._cleanliness <= 0
+        self._cleanliness = value
+        if was_dirty and value > 0:
+            self.game.end_emitters(self)
+
     @property
     def broken(self):
-        return self.durability <= 0
+        return self._durability <= 0
 
     def destroy(self):
         self.game.delete_object(self)
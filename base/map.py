@@ -1,29 +1,165 @@
+import numpy as np
+from base.enums import ObjType
+
+# Flags returned by TileGrid updates
+BLOCKED_FLIP = 1    # Cell's blocked state changed
+STATIC_FLIP = 2     # Cell's static (non-mob) blocked state changed
+SIGHT_FLIP = 4      # Cell's blocks_sight state changed
+
+
+class TileGrid():
+    """
+    Structure-of-arrays store backing the game tiles
+     - terrain: uint8 array of terrain kinds indexing the terrain definitions
+     - blocked/blocks_sight: boolean arrays derived from per-cell blocker counts.  transparent is
+       blocks_sight's inverse, as tcod's FOV takes it
+     - static_blocked: blocked by terrain or objects, ignoring mobs.  Mobs come and go
+       every tick so anything cached over the map should key off of this instead
+     - contents: sparse index of (x, y) -> objects.  Empty cells hold no entry
+     - Counts are updated incrementally as objects and terrain change so
+       blocked checks are plain array reads
+    """
+    def __init__(self, width, height, terrain_defs):
+        self.width = width
+        self.height = height
+
+        self.terrain_defs = terrain_defs
+        self.terrain_blocks = np.array([t.get("blocks") is True for t in terrain_defs], dtype=np.int16)
+        self.terrain_blocks_sight = np.array(
+            [t.get("blocks_sight", t.get("blocks")) is True for t in terrain_defs], dtype=np.int16
+        )
+
+        self.terrain = np.zeros((width, height), dtype=np.uint8)
+        self.blockers = np.zeros((width, height), dtype=np.int16)
+        self.mob_blockers = np.zeros((width, height), dtype=np.int16)
+        self.sight_blockers = np.zeros((width, height), dtype=np.int16)
+        self.blocked = np.zeros((width, height), dtype=bool)
+        self.static_blocked = np.zeros((width, height), dtype=bool)
+        self.blocks_sight = np.zeros((width, height), dtype=bool)
+        self.transparent = np.ones((width, height), dtype=bool)
+        self.explored = np.zeros((width, height), dtype=bool)
+
+        self.contents = {}
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get_contents(self, x, y):
+        return self.contents.get((x, y), [])
+
+    def add(self, obj, x, y):
+        """ Adds object to cell.  Returns BLOCKED_FLIP/STATIC_FLIP flags for the cell """
+        self.contents.setdefault((x, y), []).append(obj)
+        return self._adjust(x, y, obj.blocks is True, obj.blocks_sight is True, obj.type is ObjType.mob)
+
+    def remove(self, obj, x, y):
+        """ Removes object from cell.  Returns BLOCKED_FLIP/STATIC_FLIP flags for the cell """
+        cell = self.contents.get((x, y))
+        if not cell or obj not in cell:
+            return 0
+
+        cell.remove(obj)
+        if not cell:
+            del self.contents[(x, y)]
+        return self._adjust(x, y, -(obj.blocks is True), -(obj.blocks_sight is True), obj.type is ObjType.mob)
+
+    def set_terrain(self, x, y, kind):
+        """ Changes terrain kind of cell.  Returns BLOCKED_FLIP/STATIC_FLIP flags for the cell """
+        old = self.terrain[x, y]
+        self.terrain[x, y] = kind
+        return self._adjust(
+            x, y,
+            int(self.terrain_blocks[kind] - self.terrain_blocks[old]),
+            int(self.terrain_blocks_sight[kind] - self.terrain_blocks_sight[old])
+        )
+
+    def fill_terrain(self, kind, x1=0, y1=0, x2=None, y2=None):
+        """
+        Bulk terrain change over [x1, x2) by [y1, y2).  Used during generation,
+        so callers are responsible for rebuilding anything derived from blocked
+        """
+        area = (slice(x1, x2), slice(y1, y2))
+        old = self.terrain[area]
+        self.blockers[area] += self.terrain_blocks[kind] - self.terrain_blocks[old]
+        self.sight_blockers[area] += self.terrain_blocks_sight[kind] - self.terrain_blocks_sight[old]
+        self.terrain[area] = kind
+        self.blocked[area] = self.blockers[area] > 0
+        self.static_blocked[area] = (self.blockers[area] - self.mob_blockers[area]) > 0
+        self.blocks_sight[area] = self.sight_blockers[area] > 0
+        self.transparent[area] = np.logical_not(self.blocks_sight[area])
+
+    def _adjust(self, x, y, blocks_step, sight_step, mob=False):
+        flips = 0
+        if sight_step:
+            count = int(self.sight_blockers[x, y]) + sight_step
+            self.sight_blockers[x, y] = count
+            self.blocks_sight[x, y] = count > 0
+            self.transparent[x, y] = count <= 0
+            if count == (1 if sight_step > 0 else 0):
+                flips |= SIGHT_FLIP
+
+        if not blocks_step:
+            return flips
+
+        count = int(self.blockers[x, y]) + blocks_step
+        self.blockers[x, y] = count
+        self.blocked[x, y] = count > 0
+        # Only the first blocker in or last blocker out flips the cell
+        if count == (1 if blocks_step > 0 else 0):
+            flips |= BLOCKED_FLIP
+
+        if mob:
+            self.mob_blockers[x, y] += blocks_step
+        else:
+            static = count - int(self.mob_blockers[x, y])
+            self.static_blocked[x, y] = static > 0
+            if static == (1 if blocks_step > 0 else 0):
+                flips |= STATIC_FLIP
+        return flips
+
+
 class Tile():
     """
     Class defining game tiles
-     - Tiles control their contents and blocked/blocked sight status
+     - Tiles are thin views onto a TileGrid cell and hold no state of their own
+     - Tiles expose their contents and blocked/blocked sight status
     """
-    def __init__(self, x, y, ttype=None):
+    __slots__ = ("grid", "x", "y")
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
         self.x = x
         self.y = y
-        self.ttype = ttype
 
-        self.contents = []
-        self.explored = False
+    @property
+    def contents(self):
+        return self.grid.get_contents(self.x, self.y)
+
+    @property
+    def terrain(self):
+        return int(self.grid.terrain[self.x, self.y])
+
+    @property
+    def explored(self):
+        return bool(self.grid.explored[self.x, self.y])
+
+    @explored.setter
+    def explored(self, value):
+        self.grid.explored[self.x, self.y] = value
 
     @property
     def blocked(self):
-        return any([c.blocks is True for c in self.contents])
+        return bool(self.grid.blocked[self.x, self.y])
 
     @property
     def blocked_sight(self):
-        return any([c.blocks_sight is True for c in self.contents])
+        return bool(self.grid.blocks_sight[self.x, self.y])
 
     def add_content(self, obj):
-        self.contents.append(obj)
+        return self.grid.add(obj, self.x, self.y)
 
     def remove_content(self, obj):
-        self.contents = list(filter(lambda x: x is not obj, self.contents))
+        return self.grid.remove(obj, self.x, self.y)
 
     def adjacent(self):
         return [
@@ -1,19 +1,30 @@
 import random
-import tcod
 from math import ceil
-from numpy import array
 from constants import (
     room_types,
     game_objects,
+    game_terrain,
+    terrain_kinds,
     game_jobs,
     interiorRect,
     HALL_WIDTH,
     LIMITED_ROOMS,
+    PATH_CACHE_SIZE,
+    PATH_BACKEND,
+    PATH_REPAIR,
+    CHANGE_LOG_SIZE,
+    SIGHT_RADIUS,
+    TRAFFIC_DECAY,
+    TRAFFIC_WEIGHT,
+    TRAFFIC_MAX,
     map_width,
     map_height
 )
 from base.enums import ObjType
-from base.map import Rect, Tile
+from base.map import Rect, Tile, TileGrid, BLOCKED_FLIP, STATIC_FLIP, SIGHT_FLIP
+from base.pathing import Components, PathCache, TrafficLayer, path_backends
+from base.repair import ChangeLog, PathRepairer
+from base.sight import FieldOfView
 
 
 def room_flip(rows, flip):
@@ -54,76 +65,152 @@ class MapGenerator():
     Class Handling Map Generation and currently
     serves as the middleman between the GameInstance and the
     tiles themselves.
-     - TODO: Besides housing the path_map, which could be moved, doesn't really
+     - TODO: Besides housing the pathing backend, which could be moved, doesn't really
        make sense to have this class in use once the map's been generated
      - TODO: May make sense if multiple maps need to exist simultaneously.  Each
        could maintain their own tiles and reduce churn over expanding list of tiles
     """
-    def __init__(self, game):
+    def __init__(self, game, path_backend=PATH_BACKEND):
         self.game = game
         self.game.game_map = self
-        self.tiles = []
-        self.fov_map = None
-        self.path_map = None
+        self.grid = None
+        # What coworkers can see, cached per coworker
+        self.fov_map = FieldOfView(self, SIGHT_RADIUS)
+        self.path_backend = path_backends[path_backend]
+        self.pathing = None
+        self.components = None
+        self.traffic = None
+        self.rooms = []
+        self.path_cache = PathCache(PATH_CACHE_SIZE)
+
+        # With path_repair, each seeker keeps a PathRepairer fed from the log of changed cells
+        self.path_repair = PATH_REPAIR
+        self.change_log = ChangeLog(CHANGE_LOG_SIZE)
+        self.repairers = {}
+
+        # Bumped whenever static passability changes.  Lets caches over the map check freshness
+        self.static_version = 0
         self.interior = interiorRect
 
     def place_object(self, obj):
-        # Places object in tile and updates path_map
-        self.tiles[obj.x][obj.y].add_content(obj)
-        if self.path_map:
-            if self.tiles[obj.x][obj.y].blocked:
-                self.path_map.cost[obj.x, obj.y] = 0
-            else:
-                self.path_map.cost[obj.x, obj.y] = 1
+        # Places object in tile.  Blocked state flips go on to the pathing backend and path cache
+        self.cell_changed(obj.x, obj.y, self.grid.add(obj, obj.x, obj.y))
 
     def remove_object(self, obj):
-        # Removes object in tile and updates path_map
-        self.tiles[obj.x][obj.y].remove_content(obj)
-        if self.path_map:
-            if self.tiles[obj.x][obj.y].blocked:
-                self.path_map.cost[obj.x, obj.y] = 0
-            else:
-                self.path_map.cost[obj.x, obj.y] = 1
+        # Removes object from tile.  Blocked state flips go on to the pathing backend and path cache
+        self.cell_changed(obj.x, obj.y, self.grid.remove(obj, obj.x, obj.y))
+
+    def move_object(self, obj, x, y):
+        # Moves object between tiles.  Only tiles whose blocked state flipped are passed on to pathing
+        self.cell_changed(obj.x, obj.y, self.grid.remove(obj, obj.x, obj.y))
+        obj.x, obj.y = x, y
+        self.cell_changed(x, y, self.grid.add(obj, x, y))
+
+    def set_terrain(self, x, y, kind):
+        # Changes terrain of tile.  Blocked state flips go on to the pathing backend and path cache
+        self.cell_changed(x, y, self.grid.set_terrain(x, y, kind))
+
+    def cell_changed(self, x, y, flips):
+        # Propagates flips reported by the grid: the backend, repair log, FOV, path cache and components
+        if flips and self.pathing:
+            self.pathing.cell_changed(x, y, flips)
+        if flips & BLOCKED_FLIP:
+            self.change_log.append(x, y)
+        if flips & SIGHT_FLIP:
+            self.fov_map.cell_changed(x, y)
+        if flips & STATIC_FLIP:
+            self.static_version += 1
+            self.path_cache.invalidate(x, y)
+            if self.components:
+                self.components.update(x, y)
+
+    def set_blocks(self, obj, blocks, blocks_sight=None):
+        # Re-places object so tile blocker counts follow a change in its blocking state
+        self.remove_object(obj)
+        obj.blocks = blocks
+        if blocks_sight is not None:
+            obj.blocks_sight = blocks_sight
+        self.place_object(obj)
 
     def get_tile(self, x, y):
-        return self.tiles[x][y]
+        if not self.grid.in_bounds(x, y):
+            raise IndexError(f"Tile out of bounds: {x}, {y}")
+        return Tile(self.grid, x, y)
 
     def get_obj_tile(self, obj):
-        return self.tiles[obj.x][obj.y]
+        return Tile(self.grid, obj.x, obj.y)
 
     def get_adjacent_tiles(self, obj):
-        adj_coords = self.tiles[obj.x][obj.y].adjacent()
-        return [self.tiles[x[0]][x[1]] for x in adj_coords]
+        adj_coords = Tile(self.grid, obj.x, obj.y).adjacent()
+        return [Tile(self.grid, x, y) for x, y in adj_coords]
+
+    def can_reach(self, seeker, target):
+        # Constant time check that seeker and target aren't walled off from each other
+        return self.components.reachable((seeker.x, seeker.y), (target.x, target.y))
 
     def find_path(self, seeker, target):
         """
-        Pathing to first empty adjacent tile of target. If none exist, None will be turned and the
-        Coworker can try again next time around.
+        Pathing to whichever empty adjacent tile of target is nearest, in one search over all of them.
+        Empty if the seeker is already adjacent.  If none exist or none can be reached, None will be
+        returned and the Coworker can try again next time around.
         """
-        empty_tiles = list(filter(lambda x: not x.blocked, self.get_adjacent_tiles(target)))
-        if not empty_tiles:
-            return None
+        return self.find_paths([seeker], target)[0]
 
-        path = self.path_map.get_path(seeker.x, seeker.y, empty_tiles[0].x, empty_tiles[0].y)
-        return path
+    def find_paths(self, seekers, target):
+        """
+        find_path for several seekers after the same target.  Those not settled by the adjacent,
+        reachability and cache checks are handed to the backend together to share a search
+        """
+        adj_coords = Tile(self.grid, target.x, target.y).adjacent()
+        goals = [(x, y) for x, y in adj_coords if self.grid.in_bounds(x, y) and not self.grid.blocked[x, y]]
+
+        paths = []
+        searches = []
+        for seeker in seekers:
+            start = (seeker.x, seeker.y)
+            if start in adj_coords:
+                path = []
+            elif not self.can_reach(seeker, target):
+                path = None
+            elif self.path_repair:
+                path = self.repair_path(seeker, target) or None
+            elif not goals:
+                path = None
+            else:
+                path = self.path_cache.get((start, (target.x, target.y)), self.grid.blocked)
+                if path is None:
+                    searches.append((len(paths), start))
+            paths.append(path)
+
+        if searches:
+            starts = [start for _, start in searches]
+            for (i, start), path in zip(searches, self.pathing.get_paths(starts, goals)):
+                self.path_cache.put((start, (target.x, target.y)), path)
+                paths[i] = path or None
+        return paths
+
+    def repair_path(self, seeker, target):
+        # Repairs the seeker's search from the cells changed since its last path, or starts one for a new target
+        repairer = self.repairers.get(seeker)
+        if repairer is None or repairer.target is not target:
+            repairer = PathRepairer(self.grid, target, self.change_log)
+            self.repairers[seeker] = repairer
+        return repairer.get_path((seeker.x, seeker.y))
+
+    def forget_seeker(self, seeker):
+        # Drops the seeker's repair search, as its target changes or it leaves the map
+        self.repairers.pop(seeker, None)
 
     def generate_map(self):
-        self.tiles = [
-            [Tile(x, y) for y in range(map_height)]
-            for x in range(map_width)
-        ]
-
-        inside_tiles = self.interior.get_tiles()
-        for x in range(map_width):
-            for y in range(map_height):
-                if (x, y) not in inside_tiles:
-                    self.tiles[x][y].ttype = "grass"
-                    obj = game_objects["~"]
-                    self.game.create_object(x, y, obj)
+        self.grid = TileGrid(map_width, map_height, game_terrain)
 
+        # Grass outside, bare floor inside and walls along the interior's edges
+        self.grid.fill_terrain(terrain_kinds["~"])
+        self.grid.fill_terrain(
+            terrain_kinds[" "], self.interior.x1, self.interior.y1, self.interior.x2 + 1, self.interior.y2 + 1
+        )
         for coord in self.interior.edges():
-            obj = game_objects["#"]
-            self.game.create_object(coord[0], coord[1], obj)
+            self.set_terrain(coord[0], coord[1], terrain_kinds["#"])
 
         h_halls = []
         rooms = []
@@ -217,21 +304,26 @@ class MapGenerator():
 
         for room in rooms:
             self.place_doors(room)
+        self.rooms = rooms
 
         self.generate_coworkers()
 
     def generate_path_map(self):
-        passable = []
-        for x in range(len(self.tiles)):
-            passable_y = []
-            for y in range(len(self.tiles[x])):
-                if self.tiles[x][y].blocked:
-                    passable_y.append(0)
-                else:
-                    passable_y.append(1)
-            passable.append(passable_y)
-        passable = array(passable)
-        self.path_map = tcod.path.AStar(passable)
+        self.pathing = self.path_backend(self.grid, self.rooms)
+        self.components = Components(self.grid)
+        self.traffic = TrafficLayer(self.grid.width, self.grid.height, TRAFFIC_DECAY, TRAFFIC_WEIGHT, TRAFFIC_MAX)
+
+    def update_traffic(self):
+        """
+        Called once per tick: decays traffic, adds where coworkers stand and hands the costs to the backend.
+        Cached paths were found on the old costs, so they're dropped whenever the costs change
+        """
+        positions = [(x.x, x.y) for x in self.game.world_objs[ObjType.mob] if x.blocks]
+        version = self.traffic.version
+        if self.traffic.tick(positions) != version:
+            self.pathing.set_traffic(self.traffic.cost)
+            if self.pathing.uses_traffic:
+                self.path_cache.clear()
 
     def generate_coworkers(self):
         # Generates Player and Coworks and assigned Terminals
@@ -282,10 +374,8 @@ class MapGenerator():
                 if not val:
                     continue
 
-                elif val == "~":
-                    self.get_tile(x, y).ttype = "grass"
-                    obj = game_objects[val]
-                    self.game.create_object(x, y, obj)
+                elif val in terrain_kinds:
+                    self.set_terrain(x, y, terrain_kinds[val])
                 elif val == "M" and "bath" in rtype:
                     obj = game_objects["Mens"]
                     self.game.create_object(x, y, obj)
@@ -300,38 +390,38 @@ class MapGenerator():
     def place_doors(self, room):
         # Placing Doors
         possible_doors = []
-        # TODO:  Redo this business and drop ttype altogether
+        grass = terrain_kinds["~"]
         for x in range(room.x1 + 1, room.x2):
             if (
-                not self.tiles[x][room.y1 + 1].blocked
-                and not self.tiles[x][room.y1 - 1].blocked
-                and self.tiles[x][room.y1 + 1].ttype != "grass"
-                and self.tiles[x][room.y1 - 1].ttype != "grass"
+                not self.get_tile(x, room.y1 + 1).blocked
+                and not self.get_tile(x, room.y1 - 1).blocked
+                and self.get_tile(x, room.y1 + 1).terrain != grass
+                and self.get_tile(x, room.y1 - 1).terrain != grass
             ):
                 possible_doors.append((x, room.y1))
 
             if (
-                not self.tiles[x][room.y2 + 1].blocked
-                and not self.tiles[x][room.y2 - 1].blocked
-                and self.tiles[x][room.y2 + 1].ttype != "grass"
-                and self.tiles[x][room.y2 - 1].ttype != "grass"
+                not self.get_tile(x, room.y2 + 1).blocked
+                and not self.get_tile(x, room.y2 - 1).blocked
+                and self.get_tile(x, room.y2 + 1).terrain != grass
+                and self.get_tile(x, room.y2 - 1).terrain != grass
             ):
                 possible_doors.append((x, room.y2))
 
         for y in range(room.y1 + 1, room.y2):
             if (
-                not self.tiles[room.x1 + 1][y].blocked
-                and not self.tiles[room.x1 - 1][y].blocked
-                and self.tiles[room.x1 - 1][y].ttype != "grass"
-                and self.tiles[room.x1 + 1][y].ttype != "grass"
+                not self.get_tile(room.x1 + 1, y).blocked
+                and not self.get_tile(room.x1 - 1, y).blocked
+                and self.get_tile(room.x1 - 1, y).terrain != grass
+                and self.get_tile(room.x1 + 1, y).terrain != grass
             ):
                 possible_doors.append((room.x1, y))
 
             if (
-                not self.tiles[room.x2 + 1][y].blocked
-                and not self.tiles[room.x2 - 1][y].blocked
-                and self.tiles[room.x2 - 1][y].ttype != "grass"
-                and self.tiles[room.x2 + 1][y].ttype != "grass"
+                not self.get_tile(room.x2 + 1, y).blocked
+                and not self.get_tile(room.x2 - 1, y).blocked
+                and self.get_tile(room.x2 - 1, y).terrain != grass
+                and self.get_tile(room.x2 + 1, y).terrain != grass
             ):
                 possible_doors.append((room.x2, y))
 
@@ -346,26 +436,20 @@ class MapGenerator():
             y = possible_doors[door_index_a][1]
             obj = game_objects["+"]
 
-            # Removing wall prior to door placement
-            door_tile = self.game.get_tile(x, y)
-            walls = [x for x in door_tile.contents if x.name == "Wall"]
-            if walls:
-                self.game.delete_object(walls[0])
+            # Clearing wall prior to door placement
+            self.set_terrain(x, y, terrain_kinds[" "])
             self.game.create_object(x, y, obj)
 
             x = possible_doors[door_index_b][0]
             y = possible_doors[door_index_b][1]
-            door_tile = self.game.get_tile(x, y)
-            walls = [x for x in door_tile.contents if x.name == "Wall"]
-            if walls:
-                self.game.delete_object(walls[0])
+            self.set_terrain(x, y, terrain_kinds[" "])
             self.game.create_object(x, y, obj)
 
     def create_hall(self, hall):
         for x in range(hall.x1, hall.x2 + 1):
             for y in range(hall.y1, hall.y2 + 1):
-                self.tiles[x][y].blocked = False
-                self.tiles[x][y].block_sight = False
+                self.get_tile(x, y).blocked = False
+                self.get_tile(x, y).block_sight = False
 
     def room_fill(self, x, y, max_w):
         possible_rooms = []
@@ -0,0 +1,57 @@
+from functools import reduce
+
+
+class Modifier():
+    """
+    One layer on a stat: added to the stat's base, then the total is multiplied
+     - source: Trait, thought or aura it came from
+     - expires: Turn it wears off, or None to last
+    """
+    def __init__(self, source, stat, add=0, mult=1, expires=None):
+        self.source = source
+        self.stat = stat
+        self.add = add
+        self.mult = mult
+        self.expires = expires
+        self.removed = False
+
+
+class StatModifiers():
+    """
+    Modifier stacks on a Mob's stats
+     - base: Stat values before modifiers, for stats with a stack.  Saved when the first layer goes on
+       and put back when the last comes off
+     - The effective value, (base + adds) * mults, is set on the Mob whenever a stack changes.
+       Reading the stat is plain attribute access
+     - Expiring layers are handed to GameInstance, which removes them on the turn they wear off
+    """
+    def __init__(self, mob):
+        self.mob = mob
+        self.base = {}
+        self.stacks = {}
+
+    def add(self, modifier):
+        if modifier.stat not in self.stacks:
+            self.base[modifier.stat] = getattr(self.mob, modifier.stat)
+            self.stacks[modifier.stat] = []
+        self.stacks[modifier.stat].append(modifier)
+        if modifier.expires is not None:
+            self.mob.game.expire_at(self, modifier)
+        self.refresh(modifier.stat)
+
+    def remove(self, modifier):
+        stack = self.stacks.get(modifier.stat, [])
+        if modifier.removed or modifier not in stack:
+            return None
+        modifier.removed = True
+        stack.remove(modifier)
+        self.refresh(modifier.stat)
+
+    def refresh(self, stat):
+        stack = self.stacks[stat]
+        if not stack:
+            del self.stacks[stat]
+            setattr(self.mob, stat, self.base.pop(stat))
+            return None
+        added = self.base[stat] + sum(x.add for x in stack)
+        setattr(self.mob, stat, reduce(lambda total, x: total * x.mult, stack, added))
@@ -0,0 +1,260 @@
+from math import ceil, inf
+
+import numpy as np
+
+from constants import game_objects, NEEDS_INTERVAL
+
+# Needs above this count towards mood gain
+NEED_POSITIVE = 75
+# Columns of the need store.  Mood is worked out from the others
+NEED_COLUMNS = ("social", "hunger", "thirst", "bladder", "bowels", "energy", "work", "mood")
+COLUMN = {need: i for i, need in enumerate(NEED_COLUMNS)}
+MOOD = COLUMN["mood"]
+BLADDER = COLUMN["bladder"]
+BOWELS = COLUMN["bowels"]
+WORK = COLUMN["work"]
+# Needs that overflow on reaching 0: bladder and bowels cause accidents, work gets you fired
+OVERFLOWS = np.isin(NEED_COLUMNS, ("bladder", "bowels", "work"))
+NOT_MOOD = np.arange(len(NEED_COLUMNS)) != MOOD
+NO_EVENT = np.inf
+NEED_INDEXES = [i for i in range(len(NEED_COLUMNS)) if i != MOOD]
+OVERFLOW_INDEXES = set(np.flatnonzero(OVERFLOWS).tolist())
+
+
+def as_stat(value):
+    # The store is float so drains can be scaled.  Whole values read back as the ints they were set as
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class NeedColumn():
+    """
+    Mob attribute kept in one of NeedStore's arrays at the Mob's row
+     - array: "base" for the need itself, "drain" for its drain per need tick or "maximum"
+    """
+    def __init__(self, need, array="base"):
+        self.column = COLUMN[need]
+        self.array = array
+
+    def __get__(self, mob, owner=None):
+        if mob is None:
+            return self
+        return mob.game.need_store.get(mob.need_row, self.array, self.column)
+
+    def __set__(self, mob, value):
+        mob.game.need_store.set(mob.need_row, self.array, self.column, value)
+
+
+class NeedStore():
+    """
+    Needs of every Mob, one row each, as values at a base need tick plus drain rates.  Worked out on read
+     - Need ticks come every NEEDS_INTERVAL turns.  Needs other than mood change by their drain
+       each need tick, floored at 0
+     - Mood's rate holds steady between events: down one for each need at 0, otherwise up one
+       for each need above NEED_POSITIVE, capped at max_mood.  Plus mood's own drain, from thoughts
+     - next_event: need tick a row next changes course.  A need reaching 0 or crossing NEED_POSITIVE,
+       an overflow need running out, or mood running out.  Due rows are settled together by settle
+     - Writes rebase the row at the current tick and reschedule it
+     - live: rows started and not yet fired.  Others hold still
+    """
+    arrays = ("base", "drain", "maximum", "has", "tick", "mood_rate", "next_event", "live")
+
+    def __init__(self, game, capacity=64):
+        self.game = game
+        self.mobs = []
+        columns = len(NEED_COLUMNS)
+        self.base = np.zeros((capacity, columns))
+        self.drain = np.zeros((capacity, columns))
+        self.maximum = np.zeros((capacity, columns))
+        self.has = np.zeros((capacity, columns), dtype=bool)
+        self.tick = np.zeros(capacity, dtype=np.int64)
+        self.mood_rate = np.zeros(capacity)
+        self.next_event = np.full(capacity, NO_EVENT)
+        self.live = np.zeros(capacity, dtype=bool)
+
+    def now(self):
+        return self.game.turns // NEEDS_INTERVAL
+
+    def add(self, mob, needs):
+        """ Adds a row for mob, returning it.  It holds still until started, once mob has set its needs """
+        row = len(self.mobs)
+        if row == len(self.tick):
+            self.grow()
+        self.mobs.append(mob)
+        self.has[row] = [need in needs for need in NEED_COLUMNS]
+        return row
+
+    def grow(self):
+        for name in self.arrays:
+            array = getattr(self, name)
+            grown = np.full((len(array) * 2,) + array.shape[1:], NO_EVENT if name == "next_event" else 0, array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def start(self, row):
+        self.tick[row] = self.now()
+        self.live[row] = True
+        self.schedule(np.array([row]))
+
+    def get(self, row, array, column):
+        if array != "base" or not self.live[row]:
+            return as_stat(getattr(self, array)[row, column])
+        return as_stat(self.value_at(row, column, self.now()))
+
+    def set(self, row, array, column, value):
+        # Single rows are rebased and rescheduled on plain floats.  The array versions are for many rows
+        live = self.live[row]
+        if live:
+            tick = self.now()
+            self.base[row] = [self.value_at(row, x, tick) for x in range(len(NEED_COLUMNS))]
+            self.tick[row] = tick
+        getattr(self, array)[row, column] = value
+        if live:
+            self.schedule_row(row)
+
+    def value_at(self, row, column, tick):
+        # values_at for one cell, on plain floats
+        steps = tick - int(self.tick[row])
+        base = float(self.base[row, column])
+        if steps <= 0:
+            return base
+        if column != MOOD:
+            if not self.has[row, column]:
+                return base
+            return max(base + float(self.drain[row, column]) * steps, 0)
+        rate = float(self.mood_rate[row])
+        moved = base + rate * steps
+        return moved if rate < 0 else min(moved, float(self.maximum[row, MOOD]))
+
+    def values_at(self, rows, tick):
+        # Only valid up to each row's next event
+        steps = tick - self.tick[rows]
+        values = self.base[rows] + self.drain[rows] * self.has[rows] * steps[:, None]
+        values = np.where(steps[:, None] > 0, np.maximum(values, 0), self.base[rows])
+
+        mood = self.base[rows, MOOD]
+        rate = self.mood_rate[rows]
+        moved = mood + rate * steps
+        moved = np.where(rate < 0, moved, np.minimum(moved, self.maximum[rows, MOOD]))
+        values[:, MOOD] = np.where(steps <= 0, mood, moved)
+        return values
+
+    def rebase(self, rows, tick):
+        self.base[rows] = self.values_at(rows, tick)
+        self.tick[rows] = tick
+
+    def settle(self, tick):
+        """
+        Called by GameInstance each need tick.  Rows with an event due step from the tick before with
+        this tick's mood rate, then anything that overflowed is processed, mob by mob
+        """
+        count = len(self.mobs)
+        rows = np.flatnonzero(self.live[:count] & (self.next_event[:count] <= tick))
+        if not rows.size:
+            return None
+
+        values = self.values_at(rows, tick - 1)
+        needs = self.has[rows] & NOT_MOOD
+        values = np.where(needs, np.maximum(values + self.drain[rows], 0), values)
+
+        zeroed = ((values == 0) & needs).sum(axis=1)
+        positives = ((values > NEED_POSITIVE) & needs).sum(axis=1)
+        mood = values[:, MOOD] + self.drain[rows, MOOD]
+        values[:, MOOD] = np.where(zeroed > 0, mood - zeroed, np.minimum(mood + positives, self.maximum[rows, MOOD]))
+
+        fired = values[:, WORK] <= 0
+        quits = values[:, MOOD] <= 0
+        urine = values[:, BLADDER] <= 0
+        poo = values[:, BOWELS] <= 0
+        values[urine, BLADDER] = self.maximum[rows[urine], BLADDER]
+        values[poo, BOWELS] = self.maximum[rows[poo], BOWELS]
+
+        self.base[rows] = values
+        self.tick[rows] = tick
+        stopped = fired | quits
+        self.live[rows[stopped]] = False
+        self.next_event[rows[stopped]] = NO_EVENT
+        self.schedule(rows[~stopped])
+
+        for i in np.flatnonzero(stopped | urine | poo):
+            mob = self.mobs[rows[i]]
+            if fired[i]:
+                mob.mob_fired()
+            if quits[i]:
+                mob.mob_quits()
+            if urine[i]:
+                mob.game.create_object(mob.x, mob.y, game_objects["Urine"])
+            if poo[i]:
+                mob.game.create_object(mob.x, mob.y, game_objects["Poo"])
+
+    def schedule(self, rows):
+        # Works out mood's rate from the next tick on, and the first tick after that anything changes
+        if not rows.size:
+            return None
+        base = self.base[rows]
+        drain = self.drain[rows]
+        needs = self.has[rows] & NOT_MOOD
+
+        upcoming = np.maximum(base + drain, 0)
+        zeroed = ((upcoming == 0) & needs).sum(axis=1)
+        positives = ((upcoming > NEED_POSITIVE) & needs).sum(axis=1)
+        rate = np.where(zeroed > 0, -zeroed, positives) + drain[:, MOOD]
+        self.mood_rate[rows] = rate
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            falling = drain < 0
+            rising = drain > 0
+            runs_out = np.where(upcoming <= 0, 1, np.where(falling, np.ceil(base / -drain), NO_EVENT))
+            when = np.where(OVERFLOWS, runs_out, NO_EVENT)
+
+            # Mood's rate changes with the first step after the next where a need lands on
+            # the other side of 0 or NEED_POSITIVE
+            for threshold in (NEED_POSITIVE, 0):
+                down = np.where(falling & (base > threshold), np.ceil((base - threshold) / -drain), NO_EVENT)
+                up = np.where(rising & (base <= threshold), (threshold - base) // drain + 1, NO_EVENT)
+                crossed = np.minimum(down, up)
+                when = np.minimum(when, np.where(crossed >= 2, crossed, NO_EVENT))
+            when = np.where(needs, when, NO_EVENT).min(axis=1)
+
+            mood = base[:, MOOD]
+            empties = np.where(rate < 0, np.maximum(np.ceil(mood / -rate), 1), np.where(mood + rate <= 0, 1, NO_EVENT))
+
+        self.next_event[rows] = self.tick[rows] + np.minimum(when, empties)
+
+    def schedule_row(self, row):
+        # schedule for one row, on plain floats
+        base = self.base[row].tolist()
+        drain = self.drain[row].tolist()
+        has = self.has[row].tolist()
+        needs = [x for x in NEED_INDEXES if has[x]]
+
+        upcoming = {x: max(base[x] + drain[x], 0) for x in needs}
+        zeroed = sum(1 for x in needs if upcoming[x] == 0)
+        positives = sum(1 for x in needs if upcoming[x] > NEED_POSITIVE)
+        rate = (-zeroed if zeroed else positives) + drain[MOOD]
+        self.mood_rate[row] = rate
+
+        when = inf
+        for x in needs:
+            value, step = base[x], drain[x]
+            if x in OVERFLOW_INDEXES:
+                if upcoming[x] <= 0:
+                    when = min(when, 1)
+                elif step < 0:
+                    when = min(when, ceil(value / -step))
+            for threshold in (NEED_POSITIVE, 0):
+                if step < 0 and value > threshold:
+                    crossed = ceil((value - threshold) / -step)
+                elif step > 0 and value <= threshold:
+                    crossed = (threshold - value) // step + 1
+                else:
+                    continue
+                if crossed >= 2:
+                    when = min(when, crossed)
+
+        mood = base[MOOD]
+        if rate < 0:
+            empties = max(ceil(mood / -rate), 1)
+        else:
+            empties = 1 if mood + rate <= 0 else inf
+        self.next_event[row] = int(self.tick[row]) + min(when, empties)
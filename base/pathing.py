@@ -0,0 +1,708 @@
+import heapq
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+import tcod
+
+from base.map import BLOCKED_FLIP, STATIC_FLIP
+from base.fields import UNREACHED, distance_field, descend
+
+
+class PathCache():
+    """
+    LRU cache of paths keyed by (start, target)
+     - Entries are invalidated when a cell on, or next to, the cached path changes
+       static passability (walls, doors, furniture).  Those are the only changes that
+       could make a cached path wrong or no longer the shortest
+     - Coworkers are transient, so instead of invalidating on every step a hit is
+       checked against the current blocked array and recomputed if someone's in the way
+     - Backends weighing traffic have it cleared by MapGenerator whenever traffic costs change
+     - hits/misses/stale/invalidated counters track how many searches were saved
+    """
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.cells = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidated = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, blocked):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        path, xs, ys = entry
+        if blocked[xs, ys].any():
+            self.stale += 1
+            self._drop(key)
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(path)
+
+    def put(self, key, path):
+        if not path:
+            return None
+        if key in self.entries:
+            self._drop(key)
+
+        cells = list(path)
+        xs, ys = np.array(cells).T
+        self.entries[key] = (cells, xs, ys)
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(key)
+
+        if len(self.entries) > self.max_size:
+            self._drop(next(iter(self.entries)))
+
+    def invalidate(self, x, y):
+        # Drops every entry whose path runs through or alongside (x, y)
+        for nx in range(x - 1, x + 2):
+            for ny in range(y - 1, y + 2):
+                for key in list(self.cells.get((nx, ny), ())):
+                    self.invalidated += 1
+                    self._drop(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.cells.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "invalidated": self.invalidated
+        }
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        for cell in entry[0]:
+            keys = self.cells.get(cell)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.cells[cell]
+
+
+# Diagonal step cost used by tcod's AStar
+DIAGONAL = 1.41
+
+NEIGHBOURS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+class RoomGraph():
+    """
+    Hierarchical (HPA*-style) pathfinder over the generated rooms
+     - Regions: the inside of each room Rect.  Everything else (halls, outdoors) is region 0
+     - Portals: passable cells on room edges (doors), linking the regions they touch
+     - Each portal keeps a distance field over each region it touches, which gives the
+       portal-to-portal distances and paths inside that region without searching at query time
+     - Queries only search the start and goal regions, run Dijkstra over the portal graph and
+       stitch the cached portal paths in between, so cost follows the number of rooms
+     - Region masks and fields are cropped to the region's bounding box (portals included) and
+       held as (x1, y1, array).  Masks are cached until the region changes
+     - Static passability changes only rebuild the regions they touch.  Coworkers are ignored
+     - traffic: extra step costs, used by the searches over the start and goal regions.  The
+       cached portal fields stay on plain costs
+    """
+    def __init__(self, grid, rooms):
+        self.grid = grid
+        self.rooms = rooms
+        self.shape = (grid.width, grid.height)
+        self.traffic = None
+
+        self.region = np.zeros(self.shape, dtype=np.int16)
+        self.edge = np.zeros(self.shape, dtype=bool)
+        for room in rooms:
+            self.region[room.x1:room.x2 + 1, room.y1:room.y2 + 1] = -1
+            self.edge[room.x1:room.x2 + 1, room.y1:room.y2 + 1] = True
+        for i, room in enumerate(rooms, 1):
+            self.region[room.x1 + 1:room.x2, room.y1 + 1:room.y2] = i
+            self.edge[room.x1 + 1:room.x2, room.y1 + 1:room.y2] = False
+        self._merge_touching_regions()
+        self.boxes = self._find_boxes()
+
+        self.portal_regions = {}
+        self.region_portals = {}
+        self.region_links = {}
+        self.fields = {}
+        self.masks = {}
+        self.dirty = set()
+        self.portals_dirty = True
+
+        self.searches = 0
+        self.region_rebuilds = 0
+
+    def _merge_touching_regions(self):
+        # Overlapping Rects can leave regions touching without an edge between them.  Merge those
+        # so every crossing between regions goes through a portal
+        merged = True
+        while merged:
+            merged = False
+            for dx, dy in NEIGHBOURS[:4]:
+                a = self.region[max(dx, 0):self.shape[0] + min(dx, 0), max(dy, 0):self.shape[1] + min(dy, 0)]
+                b = self.region[max(-dx, 0):self.shape[0] + min(-dx, 0), max(-dy, 0):self.shape[1] + min(-dy, 0)]
+                touching = (a >= 0) & (b >= 0) & (a != b)
+                if touching.any():
+                    keep, drop = sorted((int(a[touching][0]), int(b[touching][0])))
+                    self.region[self.region == drop] = keep
+                    merged = True
+
+    def _find_boxes(self):
+        # Bounding box of each region, grown by a cell to take in the portals on its edge
+        boxes = {}
+        for region in np.unique(self.region[self.region >= 0]).tolist():
+            xs, ys = np.nonzero(self.region == region)
+            boxes[region] = (
+                max(int(xs.min()) - 1, 0), max(int(ys.min()) - 1, 0),
+                min(int(xs.max()) + 2, self.shape[0]), min(int(ys.max()) + 2, self.shape[1])
+            )
+        return boxes
+
+    def update(self, x, y):
+        # Called by MapGenerator when (x, y) changes static passability
+        if self.edge[x, y]:
+            self.portals_dirty = True
+        for dx, dy in ((0, 0),) + NEIGHBOURS:
+            nx, ny = x + dx, y + dy
+            if self.grid.in_bounds(nx, ny) and self.region[nx, ny] >= 0:
+                self.dirty.add(int(self.region[nx, ny]))
+
+    def regions_of(self, x, y):
+        if self.region[x, y] >= 0:
+            return {int(self.region[x, y])}
+        return self.portal_regions.get((x, y), set())
+
+    def same_region(self, a, b):
+        return bool(self.regions_of(*a) & self.regions_of(*b))
+
+    def refresh(self):
+        if self.portals_dirty:
+            self._find_portals()
+        for region in self.dirty:
+            self.masks.pop(region, None)
+            self._link_region(region)
+        self.dirty.clear()
+
+    def _find_portals(self):
+        passable = np.logical_not(self.grid.static_blocked)
+        portals = {}
+        for x, y in np.argwhere(self.edge & passable).tolist():
+            regions = set()
+            for dx, dy in NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                if self.grid.in_bounds(nx, ny) and passable[nx, ny] and self.region[nx, ny] >= 0:
+                    regions.add(int(self.region[nx, ny]))
+            portals[(x, y)] = regions
+
+        # Any region whose portals changed needs relinking
+        for portal in set(portals) | set(self.portal_regions):
+            old = self.portal_regions.get(portal, set())
+            new = portals.get(portal, set())
+            if old != new:
+                self.dirty.update(old | new)
+        self.portal_regions = portals
+        self.region_portals = {}
+        for portal, regions in self.portal_regions.items():
+            for region in regions:
+                self.region_portals.setdefault(region, []).append(portal)
+        self.portals_dirty = False
+
+    def _mask(self, region):
+        # Cached passable cells of region and its portals, over its box
+        if region not in self.masks:
+            x1, y1, x2, y2 = self.boxes[region]
+            mask = self.region[x1:x2, y1:y2] == region
+            for x, y in self.region_portals.get(region, ()):
+                mask[x - x1, y - y1] = True
+            self.masks[region] = (x1, y1, mask & np.logical_not(self.grid.static_blocked[x1:x2, y1:y2]))
+        return self.masks[region]
+
+    def region_mask(self, regions):
+        # Masks of regions combined over the box around all of them
+        if len(regions) == 1:
+            return self._mask(next(iter(regions)))
+        boxes = [self.boxes[region] for region in regions]
+        x1, y1 = min(b[0] for b in boxes), min(b[1] for b in boxes)
+        x2, y2 = max(b[2] for b in boxes), max(b[3] for b in boxes)
+        mask = np.zeros((x2 - x1, y2 - y1), dtype=bool)
+        for region in regions:
+            rx, ry, part = self._mask(region)
+            mask[rx - x1:rx - x1 + part.shape[0], ry - y1:ry - y1 + part.shape[1]] |= part
+        return x1, y1, mask
+
+    def region_cost(self, regions):
+        # Step costs within regions for query time searches, traffic included
+        x1, y1, mask = self.region_mask(regions)
+        if self.traffic is None:
+            return x1, y1, mask
+        traffic = self.traffic[x1:x1 + mask.shape[0], y1:y1 + mask.shape[1]]
+        return x1, y1, np.where(mask, traffic + 1, 0).astype(np.int8)
+
+    @staticmethod
+    def field(seeds, cost):
+        # distance_field over a cropped cost.  Seeds and result in map coords
+        x1, y1, cost = cost
+        return x1, y1, distance_field([(x - x1, y - y1) for x, y in seeds], cost)
+
+    @staticmethod
+    def field_at(field, cell):
+        x1, y1, dist = field
+        x, y = cell[0] - x1, cell[1] - y1
+        if 0 <= x < dist.shape[0] and 0 <= y < dist.shape[1]:
+            return int(dist[x, y])
+        return UNREACHED
+
+    @staticmethod
+    def descend(field, start):
+        x1, y1, dist = field
+        return [(x + x1, y + y1) for x, y in descend(dist, (start[0] - x1, start[1] - y1))]
+
+    def _link_region(self, region):
+        # Recomputes portal fields and portal-to-portal costs within region
+        self.region_rebuilds += 1
+        for key in [k for k in self.fields if k[1] == region]:
+            del self.fields[key]
+
+        portals = self.region_portals.get(region, [])
+        mask = self._mask(region)
+        links = {}
+        for portal in portals:
+            field = self.field([portal], mask)
+            self.fields[(portal, region)] = field
+            links[portal] = {}
+            for other in portals:
+                cost = self.field_at(field, other)
+                if other != portal and cost != UNREACHED:
+                    links[portal][other] = cost
+        self.region_links[region] = links
+
+    def get_path(self, start, goals):
+        """
+        Path from start to whichever goal is closest.  Same list-of-coords format as
+        tcod's AStar: start excluded, goal included.  Empty if unreachable
+        """
+        self.refresh()
+        self.searches += 1
+        blocked = self.grid.static_blocked
+        goals = [g for g in goals if not blocked[g]]
+        if not goals:
+            return []
+
+        start_regions = self.regions_of(*start)
+        goal_regions = set()
+        for goal in goals:
+            goal_regions |= self.regions_of(*goal)
+        if not start_regions or not goal_regions:
+            return []
+
+        goal_field = self.field(goals, self.region_cost(goal_regions))
+        start_field = self.field([start], self.region_cost(start_regions))
+        best_cost, best_portal, prev = self._portal_search(start, start_regions, start_field, goal_field)
+        if best_cost == UNREACHED:
+            return []
+        if best_portal is None:
+            return self.descend(goal_field, start)[1:]
+        return self._stitch(start_field, goal_field, best_portal, prev)
+
+    def _portal_search(self, start, start_regions, start_field, goal_field):
+        """
+        Dijkstra over portals, entering from the start region and leaving into the goal region.  Returns
+        (best cost, last portal or None if going straight there is best, portal -> (portal, region) before it)
+        """
+        best_cost = self.field_at(goal_field, start)
+        dist = {}
+        prev = {}
+        heap = []
+        for region in start_regions:
+            for portal in self.region_portals.get(region, ()):
+                cost = self.field_at(start_field, portal)
+                if cost != UNREACHED and cost < dist.get(portal, UNREACHED):
+                    dist[portal] = cost
+                    heapq.heappush(heap, (cost, portal))
+
+        best_portal = None
+        while heap:
+            cost, portal = heapq.heappop(heap)
+            if cost > dist.get(portal, UNREACHED) or cost >= best_cost:
+                continue
+            exit_cost = self.field_at(goal_field, portal)
+            if exit_cost != UNREACHED and cost + exit_cost < best_cost:
+                best_cost = cost + exit_cost
+                best_portal = portal
+
+            for region in self.portal_regions.get(portal, ()):
+                for other, step in self.region_links.get(region, {}).get(portal, {}).items():
+                    new_cost = cost + step
+                    if new_cost < dist.get(other, UNREACHED):
+                        dist[other] = new_cost
+                        prev[other] = (portal, region)
+                        heapq.heappush(heap, (new_cost, other))
+        return best_cost, best_portal, prev
+
+    def _stitch(self, start_field, goal_field, best_portal, prev):
+        # Refining: start -> first portal, cached portal paths within regions, last portal -> goal
+        chain = [best_portal]
+        legs = []
+        while chain[-1] in prev:
+            portal, region = prev[chain[-1]]
+            legs.append((portal, chain[-1], region))
+            chain.append(portal)
+
+        path = self.descend(start_field, chain[-1])[::-1][1:]
+        for portal, other, region in reversed(legs):
+            path += self.descend(self.fields[(other, region)], portal)[1:]
+        path += self.descend(goal_field, best_portal)[1:]
+        return path
+
+
+class Components():
+    """
+    Connected-component labels over statically passable cells, answering reachability
+    without a search
+     - 8-connected like coworker moves.  Blocked cells are labelled 0
+     - A cell opening up takes its neighbours' label, merging them if it joins several
+     - A cell closing may split its component.  That label is marked dirty and relabelled
+       on the next query, so a burst of changes costs a single pass
+     - Coworkers are ignored: they're moving every tick and don't wall anyone off for long
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.labels = np.zeros((grid.width, grid.height), dtype=np.int32)
+        self.next_label = 1
+        self.dirty = set()
+        self.relabels = 0
+        self.label(np.logical_not(grid.static_blocked))
+
+    def label(self, cells):
+        # Floods each component within the cells mask with a fresh label
+        remaining = cells.copy()
+        while remaining.any():
+            seed = tuple(np.argwhere(remaining)[0])
+            reached = distance_field([seed], remaining) != UNREACHED
+            self.labels[reached] = self.next_label
+            self.next_label += 1
+            remaining &= np.logical_not(reached)
+            self.relabels += 1
+
+    def update(self, x, y):
+        label = int(self.labels[x, y])
+        if self.grid.static_blocked[x, y]:
+            self.labels[x, y] = 0
+            if label:
+                self.dirty.add(label)
+            return None
+
+        neighbours = self.around(x, y)
+        if not neighbours:
+            self.labels[x, y] = self.next_label
+            self.next_label += 1
+            return None
+
+        label = min(neighbours)
+        self.labels[x, y] = label
+        for other in neighbours - {label}:
+            self.labels[self.labels == other] = label
+            if other in self.dirty:
+                self.dirty.discard(other)
+                self.dirty.add(label)
+
+    def refresh(self):
+        for label in self.dirty:
+            cells = self.labels == label
+            self.labels[cells] = 0
+            self.label(cells)
+        self.dirty.clear()
+
+    def around(self, x, y):
+        # Labels of (x, y) and its neighbours
+        area = self.labels[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2]
+        return {int(label) for label in area.flat if label}
+
+    def reachable(self, start, target):
+        """ True if start shares a component with any cell next to target """
+        self.refresh()
+        label = int(self.labels[start])
+        starts = {label} if label else self.around(*start)
+        return not starts.isdisjoint(self.around(*target))
+
+
+class TrafficLayer():
+    """
+    Decaying record of where coworkers have been, turned into extra step costs so paths
+    spread over the halls instead of everyone taking the same shortest one
+     - heat: decays every tick, while cells with a coworker on them gain weight
+     - cost: heat rounded and capped, as int8 extra cost per cell.  Rebuilt in bulk once per tick
+     - version: bumped on ticks the cost changed.  Returned by tick
+    """
+    def __init__(self, width, height, decay, weight, cap):
+        self.decay = decay
+        self.weight = weight
+        self.cap = cap
+        self.heat = np.zeros((width, height), dtype=np.float32)
+        self.cost = np.zeros((width, height), dtype=np.int8)
+        self.version = 0
+
+    def tick(self, positions):
+        self.heat *= self.decay
+        if positions:
+            xs, ys = np.array(positions).T
+            np.add.at(self.heat, (xs, ys), self.weight)
+        cost = np.minimum(np.rint(self.heat), self.cap).astype(np.int8)
+        if not np.array_equal(cost, self.cost):
+            self.cost[...] = cost
+            self.version += 1
+        return self.version
+
+
+class PathBackend(ABC):
+    """
+    Interface for the path finding backends MapGenerator can run with
+     - get_path: list of coords from start (excluded) to whichever of goals is closest
+       (included).  Empty if none can be reached
+     - cell_changed: told of BLOCKED_FLIP/STATIC_FLIP flags as tiles change
+     - get_paths: get_path for several starts headed to the same goals.  Backends that can
+       share one search between them override it
+     - set_traffic: given the TrafficLayer's extra step costs once per tick.  Ignored by default.
+       uses_traffic tells whether paths depend on them
+    """
+    name = None
+    uses_traffic = False
+
+    def __init__(self, grid, rooms):
+        self.grid = grid
+        self.rooms = rooms
+
+    @abstractmethod
+    def get_path(self, start, goals):
+        pass
+
+    def get_paths(self, starts, goals):
+        return [self.get_path(start, goals) for start in starts]
+
+    def cell_changed(self, x, y, flips):
+        pass
+
+    def set_traffic(self, traffic):
+        pass
+
+
+class AStarBackend(PathBackend):
+    """
+    tcod's AStar over the blocked array, coworkers included
+     - Several goals are searched at once: one Dijkstra seeded from every goal, then
+       walked down from start, instead of an AStar per goal.  Several starts headed to
+       the same goals walk down the same Dijkstra
+     - Passable cells cost 1 plus their traffic
+    """
+    name = "astar"
+    uses_traffic = True
+
+    def __init__(self, grid, rooms):
+        super().__init__(grid, rooms)
+        self.traffic = np.zeros((grid.width, grid.height), dtype=np.int8)
+        passable = np.logical_not(grid.blocked).astype(np.int8)
+        self.path_map = tcod.path.AStar(passable)
+
+    def get_path(self, start, goals):
+        if len(goals) == 1:
+            return self.path_map.get_path(*start, *goals[0])
+        return self.field_paths([start], goals)[0]
+
+    def get_paths(self, starts, goals):
+        if len(starts) == 1:
+            return [self.get_path(starts[0], goals)]
+        return self.field_paths(starts, goals)
+
+    def field_paths(self, starts, goals):
+        # Starts are blocked by the seekers themselves, so they're opened up for the field to reach them
+        cost = self.path_map.cost.copy()
+        for start in starts:
+            cost[start] = 1
+        field = distance_field(goals, cost)
+        return [descend(field, start)[1:] if field[start] != UNREACHED else [] for start in starts]
+
+    def cell_changed(self, x, y, flips):
+        if flips & BLOCKED_FLIP:
+            self.path_map.cost[x, y] = 0 if self.grid.blocked[x, y] else self.traffic[x, y] + 1
+
+    def set_traffic(self, traffic):
+        self.traffic = traffic
+        self.path_map.cost[...] = np.where(self.grid.blocked, 0, traffic + 1)
+
+
+class RoomGraphBackend(AStarBackend):
+    """ RoomGraph for trips between regions.  Short in-room trips stay on AStar """
+    name = "hpa"
+
+    def __init__(self, grid, rooms):
+        super().__init__(grid, rooms)
+        self.room_graph = RoomGraph(grid, rooms)
+
+    def get_path(self, start, goals):
+        if all(self.room_graph.same_region(start, goal) for goal in goals):
+            return super().get_path(start, goals)
+        return self.room_graph.get_path(start, goals)
+
+    def cell_changed(self, x, y, flips):
+        super().cell_changed(x, y, flips)
+        if flips & STATIC_FLIP:
+            self.room_graph.update(x, y)
+
+    def set_traffic(self, traffic):
+        super().set_traffic(traffic)
+        self.room_graph.traffic = traffic
+
+
+class JPSBackend(PathBackend):
+    """
+    Jump Point Search over the blocked array, coworkers included
+     - Same 8-connected moves and 1/1.41 step costs as tcod's AStar, corners may be cut
+     - Pruning relies on every cell costing the same, so traffic is ignored
+     - Only jump points go on the open list.  Straight runs between them are expanded
+       back into single steps for the returned path
+     - Several goals are searched at once, the heuristic taking the nearest of them
+    """
+    name = "jps"
+
+    def __init__(self, grid, rooms):
+        super().__init__(grid, rooms)
+        self.expanded = 0
+        # Nested lists padded by a blocked border so walkable needs no bounds checks.  Kept in step
+        # with the grid by cell_changed
+        self.blocked = np.pad(self.grid.blocked, 1, constant_values=True).tolist()
+
+    def cell_changed(self, x, y, flips):
+        if flips & BLOCKED_FLIP:
+            self.blocked[x + 1][y + 1] = bool(self.grid.blocked[x, y])
+
+    def get_path(self, start, goals):
+        self.goals = {goal for goal in goals if self.walkable(*goal)}
+        if not self.goals:
+            return []
+
+        open_list = [(self.heuristic(start), 0, start)]
+        g_costs = {start: 0}
+        parents = {start: None}
+        while open_list:
+            _, g, node = heapq.heappop(open_list)
+            if node in self.goals:
+                return self.expand(node, parents)
+            if g > g_costs[node]:
+                continue
+
+            self.expanded += 1
+            for dx, dy in self.directions(node, parents[node]):
+                point = self.jump(node[0], node[1], dx, dy)
+                if point is None:
+                    continue
+                steps = max(abs(point[0] - node[0]), abs(point[1] - node[1]))
+                new_g = g + steps * (DIAGONAL if dx and dy else 1)
+                if new_g < g_costs.get(point, UNREACHED):
+                    g_costs[point] = new_g
+                    parents[point] = node
+                    heapq.heappush(open_list, (new_g + self.heuristic(point), new_g, point))
+        return []
+
+    def walkable(self, x, y):
+        return not self.blocked[x + 1][y + 1]
+
+    def heuristic(self, node):
+        best = UNREACHED
+        for goal in self.goals:
+            dx = abs(node[0] - goal[0])
+            dy = abs(node[1] - goal[1])
+            best = min(best, max(dx, dy) + (DIAGONAL - 1) * min(dx, dy))
+        return best
+
+    def directions(self, node, parent):
+        # Natural and forced neighbours of node given the direction it was reached from
+        if parent is None:
+            return NEIGHBOURS
+
+        x, y = node
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        dirs = []
+        if dx and dy:
+            dirs += [(dx, dy), (dx, 0), (0, dy)]
+            if not self.walkable(x - dx, y):
+                dirs.append((-dx, dy))
+            if not self.walkable(x, y - dy):
+                dirs.append((dx, -dy))
+        elif dx:
+            dirs.append((dx, 0))
+            if not self.walkable(x, y + 1):
+                dirs.append((dx, 1))
+            if not self.walkable(x, y - 1):
+                dirs.append((dx, -1))
+        else:
+            dirs.append((0, dy))
+            if not self.walkable(x + 1, y):
+                dirs.append((1, dy))
+            if not self.walkable(x - 1, y):
+                dirs.append((-1, dy))
+        return dirs
+
+    def jump(self, x, y, dx, dy):
+        # Steps from (x, y) in direction until reaching the goal, a forced neighbour or a wall
+        walkable = self.walkable
+        while True:
+            x += dx
+            y += dy
+            if not walkable(x, y):
+                return None
+            if (x, y) in self.goals:
+                return (x, y)
+
+            if dx and dy:
+                if (
+                    (walkable(x - dx, y + dy) and not walkable(x - dx, y))
+                    or (walkable(x + dx, y - dy) and not walkable(x, y - dy))
+                ):
+                    return (x, y)
+                if self.jump(x, y, dx, 0) or self.jump(x, y, 0, dy):
+                    return (x, y)
+            elif dx:
+                if (
+                    (walkable(x + dx, y + 1) and not walkable(x, y + 1))
+                    or (walkable(x + dx, y - 1) and not walkable(x, y - 1))
+                ):
+                    return (x, y)
+            else:
+                if (
+                    (walkable(x + 1, y + dy) and not walkable(x + 1, y))
+                    or (walkable(x - 1, y + dy) and not walkable(x - 1, y))
+                ):
+                    return (x, y)
+
+    @staticmethod
+    def expand(node, parents):
+        path = []
+        while parents[node] is not None:
+            parent = parents[node]
+            dx = (node[0] > parent[0]) - (node[0] < parent[0])
+            dy = (node[1] > parent[1]) - (node[1] < parent[1])
+            x, y = node
+            while (x, y) != parent:
+                path.append((x, y))
+                x -= dx
+                y -= dy
+            node = parent
+        return path[::-1]
+
+
+path_backends = {backend.name: backend for backend in (AStarBackend, RoomGraphBackend, JPSBackend)}
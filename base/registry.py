@@ -0,0 +1,335 @@
+import heapq
+from collections import deque
+from itertools import count
+
+from base.enums import ObjType
+
+
+class ObjectRegistry():
+    """
+    Indexed store of the objects placed in the world
+     - Objects are kept in dense per-ObjType lists so rendering/AI can iterate them
+     - An object-keyed index tracks each object's slot so removal swaps the last
+       entry of the list into the hole instead of rebuilding the list
+    """
+    def __init__(self):
+        # Insertion order of types controls render order (mobs drawn last)
+        self.objs = {
+            ObjType.static: [],
+            ObjType.appliance: [],
+            ObjType.vendor: [],
+            ObjType.item: [],
+            ObjType.mob: []
+        }
+        self.index = {}
+
+    def __getitem__(self, obj_type):
+        return self.objs[obj_type]
+
+    def __iter__(self):
+        return iter(self.objs)
+
+    def items(self):
+        return self.objs.items()
+
+    def __contains__(self, obj):
+        return obj in self.index
+
+    def add(self, obj):
+        if obj in self.index:
+            return None
+        objs = self.objs[obj.type]
+        self.index[obj] = len(objs)
+        objs.append(obj)
+
+    def remove(self, obj):
+        slot = self.index.pop(obj, None)
+        if slot is None:
+            return None
+
+        objs = self.objs[obj.type]
+        last = objs.pop()
+        if last is not obj:
+            objs[slot] = last
+            self.index[last] = slot
+
+
+class SpatialHash():
+    """
+    Grid-bucket spatial index of objects
+     - Objects are bucketed into cell_size squares.  Buckets are dicts used as
+       ordered sets so ties resolve in insertion order
+     - Positions are tracked per object so moves/removals don't need a search
+    """
+    def __init__(self, cell_size=8):
+        self.cell_size = cell_size
+        self.buckets = {}
+        self.positions = {}
+        self.bounds = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __contains__(self, obj):
+        return obj in self.positions
+
+    def _bucket(self, x, y):
+        return (x // self.cell_size, y // self.cell_size)
+
+    def add(self, obj, x, y):
+        if obj in self.positions:
+            self.move(obj, x, y)
+            return None
+
+        key = self._bucket(x, y)
+        self.buckets.setdefault(key, {})[obj] = None
+        self.positions[obj] = (x, y)
+
+        # Bounds only ever grow.  Used to stop ring searches that find nothing
+        if self.bounds is None:
+            self.bounds = [key[0], key[1], key[0], key[1]]
+        else:
+            self.bounds = [
+                min(self.bounds[0], key[0]), min(self.bounds[1], key[1]),
+                max(self.bounds[2], key[0]), max(self.bounds[3], key[1])
+            ]
+
+    def remove(self, obj):
+        pos = self.positions.pop(obj, None)
+        if pos is None:
+            return None
+
+        key = self._bucket(*pos)
+        bucket = self.buckets[key]
+        del bucket[obj]
+        if not bucket:
+            del self.buckets[key]
+
+    def move(self, obj, x, y):
+        pos = self.positions.get(obj)
+        if pos is None or self._bucket(*pos) != self._bucket(x, y):
+            self.remove(obj)
+            self.add(obj, x, y)
+        else:
+            self.positions[obj] = (x, y)
+
+    def _ring(self, bx, by, r):
+        # Yields bucket keys at Chebyshev distance r from (bx, by)
+        if r == 0:
+            yield (bx, by)
+            return
+        for dx in range(-r, r + 1):
+            yield (bx + dx, by - r)
+            yield (bx + dx, by + r)
+        for dy in range(-r + 1, r):
+            yield (bx - r, by + dy)
+            yield (bx + r, by + dy)
+
+    def _max_ring(self, bx, by):
+        if self.bounds is None:
+            return -1
+        return max(bx - self.bounds[0], self.bounds[2] - bx, by - self.bounds[1], self.bounds[3] - by)
+
+    def nearest(self, x, y, accept=None):
+        """
+        Returns closest object (straight-line) passing accept, searching rings of
+        buckets outward and stopping once no unsearched bucket could hold anything closer
+        """
+        bx, by = self._bucket(x, y)
+        best = None
+        best_dist = None
+        for r in range(self._max_ring(bx, by) + 1):
+            for key in self._ring(bx, by, r):
+                for obj in self.buckets.get(key, ()):
+                    ox, oy = self.positions[obj]
+                    dist = (ox - x) ** 2 + (oy - y) ** 2
+                    if best_dist is not None and dist >= best_dist:
+                        continue
+                    if accept and not accept(obj):
+                        continue
+                    best, best_dist = obj, dist
+
+            # Anything in ring r + 1 is more than r * cell_size away
+            if best_dist is not None and best_dist <= (r * self.cell_size) ** 2:
+                break
+
+        return best
+
+    def k_nearest(self, x, y, k, accept=None):
+        """
+        Returns up to k closest objects (straight-line) passing accept, nearest first.  Searches rings
+        of buckets outward, stopping once no unsearched bucket could hold anything closer than the kth
+        """
+        bx, by = self._bucket(x, y)
+        # Max-heap of (-distance, -seq, obj).  Among equally close, the first found are kept
+        found = []
+        seq = 0
+        for r in range(self._max_ring(bx, by) + 1):
+            for key in self._ring(bx, by, r):
+                for obj in self.buckets.get(key, ()):
+                    ox, oy = self.positions[obj]
+                    dist = (ox - x) ** 2 + (oy - y) ** 2
+                    if len(found) == k and dist >= -found[0][0]:
+                        continue
+                    if accept and not accept(obj):
+                        continue
+                    seq += 1
+                    if len(found) < k:
+                        heapq.heappush(found, (-dist, -seq, obj))
+                    else:
+                        heapq.heapreplace(found, (-dist, -seq, obj))
+
+            # Anything in ring r + 1 is more than r * cell_size away
+            if len(found) == k and -found[0][0] <= (r * self.cell_size) ** 2:
+                break
+
+        return [obj for _, _, obj in sorted(found, key=lambda x: (-x[0], -x[1]))]
+
+    def within(self, x, y, radius, accept=None):
+        """ Returns objects within radius (straight-line) of (x, y) passing accept, in bucket order """
+        min_x, min_y = self._bucket(x - radius, y - radius)
+        max_x, max_y = self._bucket(x + radius, y + radius)
+        found = []
+        for bx in range(min_x, max_x + 1):
+            for by in range(min_y, max_y + 1):
+                for obj in self.buckets.get((bx, by), ()):
+                    ox, oy = self.positions[obj]
+                    if (ox - x) ** 2 + (oy - y) ** 2 > radius ** 2:
+                        continue
+                    if accept and not accept(obj):
+                        continue
+                    found.append(obj)
+        return found
+
+
+class NeedRegistry():
+    """
+    Spatial indexes of usable objects keyed by the needs they satisfy
+     - Maintained by GameInstance as objects enter/leave tiles (create, delete, pickup, drop)
+     - versions: bumped per need whenever one of its objects is added, removed or changes
+       usable state so anything derived from the index can tell when it's stale
+    """
+    def __init__(self):
+        self.needs = {}
+        self.versions = {}
+
+    def add(self, obj):
+        for need in getattr(obj, "satisfies", None) or []:
+            self.needs.setdefault(need, SpatialHash()).add(obj, obj.x, obj.y)
+            self.versions[need] = self.versions.get(need, 0) + 1
+
+    def remove(self, obj):
+        for need in getattr(obj, "satisfies", None) or []:
+            index = self.needs.get(need)
+            if index and obj in index:
+                index.remove(obj)
+                self.versions[need] += 1
+
+    def touch(self, obj):
+        # Marks the needs of an indexed object as changed (occupied, broken, etc.)
+        for need in getattr(obj, "satisfies", None) or []:
+            if obj in self.needs.get(need, ()):
+                self.versions[need] += 1
+
+    def find(self, need):
+        return list(self.needs.get(need, ()))
+
+    def nearest(self, need, x, y, accept=None):
+        index = self.needs.get(need)
+        if not index:
+            return None
+        return index.nearest(x, y, accept)
+
+
+class RequestBoard():
+    """
+    Pending WorkRequests and the workers who can take them
+     - requests: (name, target) -> request, so duplicates are turned away with a lookup.  In posting order
+     - queues: unassigned requests per job, oldest first
+     - workers: heap per job of (load, seq, worker).  load is the worker's count of assigned requests.
+       Entries go stale as loads change and are skipped when they come up
+     - Among the least loaded, the nearest of the first few to the request's target gets it
+    """
+    def __init__(self, candidates=4):
+        self.candidates = candidates
+        self.requests = {}
+        self.queues = {}
+        self.workers = {}
+        self.loads = {}
+        self.entries = {}
+        self.seq = count()
+
+    def __len__(self):
+        return len(self.requests)
+
+    def __iter__(self):
+        return iter(self.requests.values())
+
+    def __contains__(self, key):
+        return key in self.requests
+
+    def add_worker(self, worker):
+        self.set_load(worker, 0)
+
+    def set_load(self, worker, load):
+        entry = (load, next(self.seq), worker)
+        self.loads[worker] = load
+        self.entries[worker] = entry[1]
+        heapq.heappush(self.workers.setdefault(worker.job, []), entry)
+
+    def post(self, request):
+        """ Queues request unless an equal one (same name and target) is pending.  Returns whether it was """
+        key = (request.name, request.target)
+        if key in self.requests:
+            return False
+        self.requests[key] = request
+        self.queues.setdefault(request.job, deque()).append(request)
+        return True
+
+    def complete(self, request):
+        if self.requests.get((request.name, request.target)) is not request:
+            return None
+        del self.requests[(request.name, request.target)]
+        if request.assignee in self.loads:
+            self.set_load(request.assignee, self.loads[request.assignee] - 1)
+
+    def claim(self, request):
+        """ Picks the worker for request and counts it against their load.  None if no one has the job """
+        heap = self.workers.get(request.job, [])
+        tied = []
+        while heap and len(tied) < self.candidates:
+            load, seq, worker = heap[0]
+            if self.entries.get(worker) != seq or worker.fired:
+                heapq.heappop(heap)
+                continue
+            if tied and load > tied[0][0]:
+                break
+            tied.append(heapq.heappop(heap))
+        if not tied:
+            return None
+
+        target = request.target
+        best = min(tied, key=lambda x: (max(abs(x[2].x - target.x), abs(x[2].y - target.y)), x[1]))
+        for entry in tied:
+            if entry is not best:
+                heapq.heappush(heap, entry)
+        self.set_load(best[2], best[0] + 1)
+        return best[2]
+
+    def assign(self):
+        """ Yields (request, worker) for queued requests as long as each job has workers """
+        for job, queue in self.queues.items():
+            while queue:
+                request = queue[0]
+                if self.requests.get((request.name, request.target)) is not request:
+                    queue.popleft()
+                    continue
+                worker = self.claim(request)
+                if worker is None:
+                    print(f"No candidate found for {request.name} of {request.target.name}")
+                    break
+                queue.popleft()
+                yield request, worker
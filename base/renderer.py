@@ -1,4 +1,5 @@
 import textwrap
+import numpy as np
 from random import randint
 from tcod.console import Console
 from constants import (
@@ -10,6 +11,7 @@ from constants import (
     MSG_HEIGHT,
     msg_width,
     colors,
+    game_terrain,
 )
 
 
@@ -89,7 +91,12 @@ class Renderer():
 
         self.action_cache = {}
 
+        # Lookup tables indexed by terrain kind
+        self.terrain_chars = np.array([ord(t["char"]) for t in game_terrain])
+        self.terrain_colors = np.array([colors[t["color"]] for t in game_terrain])
+
     def render_all(self):
+        self.render_terrain()
         for obj_type in self.game.world_objs:
             for obj in self.game.world_objs[obj_type]:
                 self.render(obj)
@@ -103,6 +110,14 @@ class Renderer():
     def render(self, obj):
         self.root_console.print(x=obj.x, y=obj.y, string=obj.char, fg=obj.color, bg=colors["black"])
 
+    def render_terrain(self):
+        # Terrain is drawn straight from the grid's kind array.  Bare floor (kind 0) is left cleared
+        grid = self.game.game_map.grid
+        drawn = grid.terrain > 0
+        kinds = grid.terrain[drawn]
+        self.root_console.ch[:grid.width, :grid.height][drawn] = self.terrain_chars[kinds]
+        self.root_console.fg[:grid.width, :grid.height][drawn] = self.terrain_colors[kinds]
+
     def render_actions(self):
         for action in self.game.actions:
             if not self.action_cache.get(action):
@@ -0,0 +1,155 @@
+import heapq
+from collections import deque
+from itertools import islice
+
+from base.pathing import NEIGHBOURS
+
+INF = float("inf")
+# Step costs, scaled from tcod AStar's 1/1.41 so keys compare exactly
+CARDINAL_COST = 100
+DIAGONAL_COST = 141
+
+
+class ChangeLog():
+    """
+    Bounded log of cells whose blocked state flipped, in the order they changed
+     - end: count of cells ever logged.  Readers keep the end they last read up to
+     - Readers that fall further behind than the log holds are told to start over
+    """
+    def __init__(self, max_size=4096):
+        self.cells = deque(maxlen=max_size)
+        self.end = 0
+
+    def append(self, x, y):
+        self.cells.append((x, y))
+        self.end += 1
+
+    def since(self, position):
+        """ Set of cells changed since position, or None if they're no longer all held """
+        behind = self.end - position
+        if behind > len(self.cells):
+            return None
+        return set(islice(self.cells, len(self.cells) - behind, None))
+
+
+class PathRepairer():
+    """
+    D* Lite search kept between calls, from the cells around a target back to a seeker
+     - Same 8-connected moves and costs as tcod's AStar over the blocked array.  The seeker's
+       own cell counts as open
+     - Every cell next to the target is a goal, so it paths to whichever is nearest
+     - Each call reads the cells changed since the last one from the ChangeLog and only repairs the
+       part of the search they affect.  As the seeker moves, km keeps old queue keys valid instead
+       of reordering the queue
+    """
+    def __init__(self, grid, target, log):
+        self.grid = grid
+        self.target = target
+        self.log = log
+        self.expanded = 0
+        self.reset()
+
+    def reset(self):
+        self.position = self.log.end
+        self.start = None
+        self.km = 0
+        self.g = {}
+        self.rhs = {}
+        self.queue = []
+        self.goals = {
+            (self.target.x + dx, self.target.y + dy) for dx, dy in NEIGHBOURS
+            if self.grid.in_bounds(self.target.x + dx, self.target.y + dy)
+        }
+        for goal in self.goals:
+            self.rhs[goal] = 0
+
+    def get_path(self, start):
+        """ Path from start to the nearest goal, start excluded.  Empty if none can be reached """
+        changed = self.log.since(self.position)
+        if changed is None:
+            self.reset()
+            changed = set()
+        self.position = self.log.end
+
+        if self.start is None:
+            self.start = start
+            for goal in self.goals:
+                heapq.heappush(self.queue, (self.key(goal), goal))
+        elif start != self.start:
+            self.km += self.heuristic(self.start, start)
+            changed |= {self.start, start}
+            self.start = start
+
+        for cell in changed:
+            self.update(cell)
+            for neighbour in self.neighbours(cell):
+                self.update(neighbour)
+        self.compute()
+
+        if self.g.get(start, INF) == INF:
+            return []
+
+        path = []
+        node = start
+        while node not in self.goals and len(path) < self.grid.width * self.grid.height:
+            node = min(self.neighbours(node), key=lambda x: self.cost(node, x) + self.g.get(x, INF))
+            path.append(node)
+        return path
+
+    def blocked(self, cell):
+        return cell != self.start and self.grid.blocked[cell]
+
+    def cost(self, a, b):
+        if self.blocked(a) or self.blocked(b):
+            return INF
+        return DIAGONAL_COST if a[0] != b[0] and a[1] != b[1] else CARDINAL_COST
+
+    def neighbours(self, cell):
+        x, y = cell
+        return [
+            (x + dx, y + dy) for dx, dy in NEIGHBOURS
+            if 0 <= x + dx < self.grid.width and 0 <= y + dy < self.grid.height
+        ]
+
+    @staticmethod
+    def heuristic(a, b):
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return CARDINAL_COST * max(dx, dy) + (DIAGONAL_COST - CARDINAL_COST) * min(dx, dy)
+
+    def key(self, cell):
+        best = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        return (best + self.heuristic(self.start, cell) + self.km, best)
+
+    def update(self, cell):
+        if cell not in self.goals:
+            self.rhs[cell] = min(self.cost(cell, x) + self.g.get(x, INF) for x in self.neighbours(cell))
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            heapq.heappush(self.queue, (self.key(cell), cell))
+
+    def compute(self):
+        # Queue entries are left in place when a cell's key changes.  Stale ones are skipped or requeued as popped
+        start = self.start
+        while self.queue:
+            old_key, cell = self.queue[0]
+            if old_key >= self.key(start) and self.rhs.get(start, INF) == self.g.get(start, INF):
+                break
+            heapq.heappop(self.queue)
+
+            g = self.g.get(cell, INF)
+            rhs = self.rhs.get(cell, INF)
+            if g == rhs:
+                continue
+            new_key = self.key(cell)
+            if old_key < new_key:
+                heapq.heappush(self.queue, (new_key, cell))
+                continue
+
+            self.expanded += 1
+            if g > rhs:
+                self.g[cell] = rhs
+            else:
+                self.g[cell] = INF
+                self.update(cell)
+            for neighbour in self.neighbours(cell):
+                self.update(neighbour)
@@ -0,0 +1,137 @@
+import heapq
+
+from base.enums import ObjType
+from base.pathing import NEIGHBOURS
+
+# Waiting in place is a move like any other when planning over time
+MOVES = ((0, 0),) + NEIGHBOURS
+
+
+class ReservationTable():
+    """
+    Space-time reservations of coworker steps, keyed by (x, y, tick)
+     - Coworkers reserve their next few steps, one cell per tick, and later planners route around them
+       (Windowed Hierarchical Cooperative A*, WHCA*, less the hierarchy: the window heads for a
+       waypoint on the coworker's regular path instead)
+     - horizon: last tick each coworker holds a plan for.  Beyond it they're treated as standing still
+     - Reservations are dropped when replanned or released, older ticks simply stop mattering
+     - Most windows run straight along the coworker's path.  The search only runs where that
+       would conflict, and gives up after max_nodes states with the plan ending nearest the goal
+    """
+    def __init__(self, max_nodes=256):
+        self.max_nodes = max_nodes
+        self.cells = {}
+        self.held = {}
+        self.horizon = {}
+        # follows: windows taken straight off the path.  plans: windows searched around a conflict
+        self.follows = 0
+        self.plans = 0
+
+    def reserve(self, mob, start, steps, tick):
+        """ Reserves start for the tick before tick, then steps one tick each.  Returns the reserved keys """
+        self.release(mob)
+        keys = [(start[0], start[1], tick - 1)]
+        keys += [(x, y, tick + i) for i, (x, y) in enumerate(steps)]
+        for key in keys:
+            self.cells[key] = mob
+        self.held[mob] = keys
+        self.horizon[mob] = keys[-1][2]
+        return keys[1:]
+
+    def release(self, mob):
+        for key in self.held.pop(mob, ()):
+            if self.cells.get(key) is mob:
+                del self.cells[key]
+        self.horizon.pop(mob, None)
+
+    def is_free(self, mob, x, y, tick, grid):
+        """
+        Whether mob may stand in (x, y) at tick
+         - Not reserved by anyone else for that tick, or the one before.  Coworkers move one after
+           another within a tick, so walking into a cell as its holder leaves it, or swapping
+           with them, would find it still blocked
+         - Not where a coworker without a plan for that tick is standing.  Read from the grid's mob
+           blockers, so only cells someone stands on are looked into
+        """
+        owner = self.cells.get((x, y, tick))
+        if owner is not None and owner is not mob:
+            return False
+        owner = self.cells.get((x, y, tick - 1))
+        if owner is not None and owner is not mob:
+            return False
+        if not grid.mob_blockers[x, y]:
+            return True
+        for occupant in grid.get_contents(x, y):
+            if occupant is not mob and occupant.type is ObjType.mob and occupant.blocks is True:
+                if self.horizon.get(occupant, -1) < tick:
+                    return False
+        return True
+
+    def follow(self, mob, start, path, tick, grid, window):
+        """
+        Steps straight along path for up to window ticks, if every one is free when it'd be taken.
+        Returns None on any conflict, or if path doesn't carry on from start, for plan to settle
+        """
+        steps = path[:window]
+        x, y = start
+        for i, (nx, ny) in enumerate(steps):
+            if max(abs(nx - x), abs(ny - y)) != 1 or grid.static_blocked[nx, ny]:
+                return None
+            if not self.is_free(mob, nx, ny, tick + i, grid):
+                return None
+            x, y = nx, ny
+        self.follows += 1
+        return steps
+
+    def plan(self, mob, start, goal, tick, grid, window):
+        """
+        Cooperative A* from start towards goal over (x, y, tick), starting at tick
+         - Every step takes a tick, waiting included, so the cost of a state is its tick
+         - grid: TileGrid, for its static blocked array and the coworkers standing in the way
+         - Searches window ticks ahead.  If goal is further, the plan ending nearest it is used.  So is
+           the nearest found so far, once max_nodes states have been expanded
+        Returns the cell to be in for each tick, possibly fewer than window.  Empty if boxed in
+        """
+        self.plans += 1
+        blocked = grid.static_blocked
+        width, height = blocked.shape
+        gx, gy = goal
+        end = tick + window - 1
+
+        root = (start[0], start[1], tick - 1)
+        parents = {root: None}
+        open_list = [(max(abs(start[0] - gx), abs(start[1] - gy)), 0, root)]
+        best = (open_list[0][0], root)
+        expanded = 0
+        while open_list:
+            state = heapq.heappop(open_list)[2]
+            x, y, t = state
+            h = max(abs(x - gx), abs(y - gy))
+            if (h, -t) < (best[0], -best[1][2]):
+                best = (h, state)
+            expanded += 1
+            if (x, y) == goal or t == end or expanded > self.max_nodes:
+                if expanded > self.max_nodes:
+                    state = best[1]
+                steps = []
+                while parents[state] is not None:
+                    steps.append(state[:2])
+                    state = parents[state]
+                return steps[::-1]
+
+            for dx, dy in MOVES:
+                nx = x + dx
+                ny = y + dy
+                next_state = (nx, ny, t + 1)
+                if next_state in parents:
+                    continue
+                if not (0 <= nx < width and 0 <= ny < height) or blocked[nx, ny]:
+                    continue
+                if not self.is_free(mob, nx, ny, t + 1, grid):
+                    continue
+                parents[next_state] = state
+                # Ties favour the deeper state, which is closer to done
+                h = max(abs(nx - gx), abs(ny - gy))
+                g = t + 1 - root[2]
+                heapq.heappush(open_list, (g + h, -g, next_state))
+        return []
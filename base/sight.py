@@ -0,0 +1,66 @@
+import numpy as np
+import tcod.map
+
+
+class FieldOfView():
+    """
+    What each coworker can see, from tcod's FOV over the grid's transparent array
+     - Only the window within radius of the coworker is computed, and kept per coworker with where
+       it was seen from
+     - Kept until the coworker moves, or a cell within radius of it starts or stops blocking sight.
+       changed holds the stamp of each cell's last sight flip, fed by MapGenerator, so a view is
+       fresh while nothing in its window is stamped later than it
+    """
+    def __init__(self, game_map, radius=8):
+        self.game_map = game_map
+        self.radius = radius
+        self.changed = None
+        self.stamp = 0
+        self.views = {}
+        self.computed = 0
+
+    def cell_changed(self, x, y):
+        if self.changed is None:
+            return None
+        self.stamp += 1
+        self.changed[x, y] = self.stamp
+
+    def forget(self, mob):
+        self.views.pop(mob, None)
+
+    def view(self, mob):
+        """ Returns (x1, y1, visible) for mob, visible being its window with x1, y1 at [0, 0] """
+        grid = self.game_map.grid
+        if self.changed is None:
+            self.changed = np.zeros((grid.width, grid.height), dtype=np.int64)
+
+        view = self.views.get(mob)
+        if view and view[:2] == (mob.x, mob.y):
+            x1, y1, visible = view[3:]
+            if self.changed[x1:x1 + visible.shape[0], y1:y1 + visible.shape[1]].max() <= view[2]:
+                return x1, y1, visible
+
+        r = self.radius
+        x1, y1 = max(mob.x - r, 0), max(mob.y - r, 0)
+        x2, y2 = min(mob.x + r + 1, grid.width), min(mob.y + r + 1, grid.height)
+        visible = tcod.map.compute_fov(
+            grid.transparent[x1:x2, y1:y2], (mob.x - x1, mob.y - y1), radius=r, light_walls=True
+        )
+        self.views[mob] = (mob.x, mob.y, self.stamp, x1, y1, visible)
+        self.computed += 1
+        return x1, y1, visible
+
+    def sees(self, mob, x, y):
+        x1, y1, visible = self.view(mob)
+        x -= x1
+        y -= y1
+        return 0 <= x < visible.shape[0] and 0 <= y < visible.shape[1] and bool(visible[x, y])
+
+    def seen_objects(self, mob):
+        # Objects on the cells mob can see
+        x1, y1, visible = self.view(mob)
+        contents = self.game_map.grid.contents
+        seen = []
+        for x, y in zip(*np.nonzero(visible)):
+            seen.extend(contents.get((x1 + int(x), y1 + int(y)), []))
+        return seen
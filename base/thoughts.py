@@ -1,3 +1,7 @@
+from constants import MEMORY_INTERVAL, NEEDS_INTERVAL
+from base.modifiers import Modifier
+
+
 class WorkRequest():
     def __init__(self, game, name, job, target, actions, target_func=None):
         self.game = game
@@ -20,23 +24,30 @@ class WorkRequest():
 
 
 class Thought():
-    def __init__(self, name, description, duration, target_stat, modifier):
+    def __init__(self, name, description, duration, target_stat, modifier, **kwargs):
         self.name = name
         self.description = description
         self.duration = duration
         self.target_stat = target_stat
         self.modifier = modifier
+        self.layer = None
 
-    def apply_modifier(self, target):
-        attr = getattr(target, self.target_stat)
-        attr += self.modifier
-        setattr(target, self.target_stat, attr)
+    def as_modifier(self, mob):
+        """
+        Layer on mob's stats for as long as the thought lasts.  Duration and modifier count memory ticks.
+        Thoughts on a need change how quickly it drains, spread over the need ticks in between
+        """
+        expires = mob.game.turns + self.duration * MEMORY_INTERVAL * NEEDS_INTERVAL
+        if self.target_stat in mob.needs:
+            return Modifier(self, f"{self.target_stat}_drain", add=self.modifier / MEMORY_INTERVAL, expires=expires)
+        return Modifier(self, self.target_stat, add=self.modifier, expires=expires)
 
 
 class Memories():
     def __init__(self, mob):
         self.mob = mob
-        self.broken_items = []
+        # Ordered dict used as an ordered set: O(1) membership, oldest first
+        self.broken_items = {}
         self.work_tasks = []
         self.thoughts = []
         self.relationships = []
@@ -44,17 +55,27 @@ class Memories():
 
     def tick_memories(self):
         """
-        Every 20 turns, remove oldest item found to be broken,
-        tick thought lifetimes, apply modifiers, and remove timed out thoughts
+        Every MEMORY_INTERVAL need ticks, remove oldest item found to be broken,
+        and drop thoughts that have worn off.  They're taken off stats by the modifier stack on expiry
         """
         self.iters += 1
-        if not self.iters % 20:
+        if not self.iters % MEMORY_INTERVAL:
             if self.broken_items:
-                self.broken_items.pop(0)
-            for thought in self.thoughts:
-                thought.apply_modifier(self.mob)
-                thought.duration -= 1
-            self.thoughts = [t for t in self.thoughts if t.duration <= 0]
+                del self.broken_items[next(iter(self.broken_items))]
+            self.thoughts = [t for t in self.thoughts if not t.layer.removed]
+
+    def add_thought(self, thought):
+        # Having the same thought again starts it over rather than doubling it up
+        for held in self.thoughts:
+            if held.name == thought.name:
+                self.mob.modifiers.remove(held.layer)
+        self.thoughts = [t for t in self.thoughts if not t.layer.removed]
+        thought.layer = thought.as_modifier(self.mob)
+        self.thoughts.append(thought)
+        self.mob.modifiers.add(thought.layer)
+
+    def has_thought(self, name):
+        return any(t.name == name and not t.layer.removed for t in self.thoughts)
 
     def add_broken(self, obj):
         """
@@ -62,13 +83,8 @@ class Memories():
         Add broken object to end of list
         - pop done to "refresh" memory
         """
-        try:
-            i = self.broken_items.index(obj)
-            self.broken_items.pop(i)
-        except ValueError:
-            pass
-        finally:
-            self.broken_items.append(obj)
+        self.broken_items.pop(obj, None)
+        self.broken_items[obj] = None
 
     def finish_job(self, job):
         self.work_tasks = [x for x in self.work_tasks if x is not job]
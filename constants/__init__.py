@@ -1,6 +1,7 @@
 import json
 import tcod
 from base.map import Rect
+from base.effects import compile_effect
 
 ROOM_SECTOR_X = 18
 ROOM_SECTOR_Y = 22
@@ -14,6 +15,32 @@ MAP_WIDTH = 0
 MAP_HEIGHT = 0
 
 LIMITED_ROOMS = ['manager', 'patio']
+
+# Max number of (start, goal) paths MapGenerator keeps cached
+PATH_CACHE_SIZE = 512
+# Path finding backend: astar, hpa (room graph) or jps (jump point search)
+PATH_BACKEND = "astar"
+# Keep a D* Lite search per coworker and repair it from changed cells instead of searching anew.
+# Off by default: tcod's searches are quicker from scratch on maps this size
+PATH_REPAIR = False
+CHANGE_LOG_SIZE = 4096
+# Turns between coworker need ticks
+NEEDS_INTERVAL = 6
+# Need ticks between coworker memory ticks (forgetting broken items).  Thought durations count these
+MEMORY_INTERVAL = 20
+# Steps auras spread from what gives them off, unless the emission sets a radius
+AURA_RADIUS = 3
+# How far coworkers see
+SIGHT_RADIUS = 8
+# Ticks of steps coworkers reserve ahead of themselves when moving
+RESERVATION_WINDOW = 8
+# Traffic: extra path cost where coworkers have recently been.  Heat decays each tick,
+# cells with a coworker on them gain weight, and the extra cost is capped
+TRAFFIC_DECAY = 0.9
+TRAFFIC_WEIGHT = 2
+TRAFFIC_MAX = 8
+# Seed for map generation and AI.  None for a fresh game each run
+SEED = None
 COWORKERS = []
 
 # Defining Building Space
@@ -65,6 +92,13 @@ with open("defs/rooms.txt") as room_file:
 with open("defs/objects.json") as obj_file:
     game_objects = json.loads(obj_file.read())
 
+# Terrain kinds index into game_terrain.  Bare floor (" ") is always kind 0
+terrain_kinds = {" ": 0}
+for key, obj in game_objects.items():
+    if obj["obj_type"] == "terrain" and key not in terrain_kinds:
+        terrain_kinds[key] = len(terrain_kinds)
+game_terrain = [game_objects[key] for key in terrain_kinds]
+
 with open("defs/jobs.json") as obj_file:
     game_jobs = json.loads(obj_file.read())
 
@@ -74,9 +108,16 @@ with open("defs/requests.json") as req_file:
 with open("defs/actions.json") as obj_file:
     game_actions = json.loads(obj_file.read())
 
+# Effects are compiled once here, so resolving an action is plain function calls
+for action_def in game_actions.values():
+    action_def["effects"] = [compile_effect(x) for x in action_def.get("effects", [])]
+
 with open("defs/emissions.json") as emit_file:
     game_auras = json.loads(emit_file.read())
 
+with open("defs/traits.json") as trait_file:
+    game_traits = json.loads(trait_file.read())
+
 with open('defs/female_names.txt') as names:
     female_names = [n.strip() for n in names.readlines()]
 
@@ -0,0 +1,41 @@
+import os
+import random
+import sys
+
+import pytest
+
+# Defs are read relative to the repo root as constants is imported
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+from base.game import GameInstance  # noqa: E402
+from base.map_gen import MapGenerator  # noqa: E402
+
+
+class HeadlessRenderer():
+    """ Takes the renderer's place so games run without a console """
+    def __init__(self, game):
+        game.renderer = self
+        self.action_cache = {}
+
+    def log_message(self, *args, **kwargs):
+        pass
+
+    def init_popup(self, *args, **kwargs):
+        pass
+
+
+def make_game(seed=3):
+    random.seed(seed)
+    game = GameInstance()
+    HeadlessRenderer(game)
+    game_map = MapGenerator(game)
+    game_map.generate_map()
+    game_map.generate_path_map()
+    return game
+
+
+@pytest.fixture
+def game():
+    return make_game()
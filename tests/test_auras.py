@@ -0,0 +1,27 @@
+from base.enums import ObjType
+
+
+def test_clean_request_ends_dirty_aura(game):
+    appliance = next(
+        x for x in game.world_objs[ObjType.appliance] if x.on_dirty and x.on_dirty.get("request") == "Clean"
+    )
+    aura = appliance.on_dirty["emits"]
+
+    appliance.cleanliness = 0
+    appliance.eval_events()
+    assert (appliance, aura) in game.auras.emitters
+    assert game.auras.grid(aura)[appliance.x, appliance.y] > 0
+
+    job = next(x for x in game.work_requests if x.target is appliance)
+    cleaner = next(x for x in game.world_objs[ObjType.mob] if x is not game.player)
+    cleaner.add_task(job)
+    cleaner.target_job = job
+    job.init_request(cleaner)
+    while game.actions:
+        game.turns += 1
+        game.run_actions()
+
+    assert appliance.cleanliness == 100
+    assert (appliance, aura) not in game.auras.emitters
+    assert game.auras.grid(aura)[appliance.x, appliance.y] == 0
+    assert (job.name, appliance) not in game.work_requests
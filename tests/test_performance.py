@@ -0,0 +1,23 @@
+import time
+
+from base.enums import ObjType
+from tests.conftest import make_game
+
+TURNS = 2000
+# Generous, so slower machines pass.  Runs about 1.5s where it was written
+BUDGET = 8.0
+
+
+def test_turn_loop_with_full_office():
+    game = make_game(seed=21)
+    assert len(game.world_objs[ObjType.mob]) == 12
+
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        game.run_coworkers()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < BUDGET
+    # Step windows mostly come straight off paths.  The space-time search is for conflicts
+    reservations = game.reservations
+    assert reservations.plans < (reservations.plans + reservations.follows) / 4